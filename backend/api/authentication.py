@@ -0,0 +1,183 @@
+"""Аутентификация по токену с кешированием пользователя.
+
+TokenAuthentication выполняет запрос Token + User на каждый запрос
+с токеном. CachedTokenAuthentication держит найденную пару в двух
+уровнях: в ограниченном LRU-кеше процесса с коротким временем жизни
+и в общем кеше Django (Redis на сервере).
+
+Удаление токена (выход через djoser), изменение или деактивация
+пользователя удаляют запись из общего кеша и меняют поколение кеша.
+Поколение сверяется при каждом запросе, поэтому записи LRU-кешей всех
+воркеров устаревают сразу, а не по истечении времени жизни. С кешем,
+который у каждого процесса свой (LocMemCache, DummyCache), поколение
+не было бы общим, поэтому кеш токенов в этом случае отключен.
+
+В кеш попадают только поля пользователя из USER_FIELDS и дата создания
+токена; остальные поля, включая хеш пароля, отложены и загружаются
+из базы при обращении.
+"""
+from collections import Counter, OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+# Поля пользователя, которые читают представления и права доступа.
+USER_FIELDS = (
+    'id',
+    'username',
+    'email',
+    'first_name',
+    'last_name',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+)
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+class TokenCache:
+    """Двухуровневый кеш пар (пользователь, токен) по ключу токена."""
+
+    KEY_PREFIX = 'auth_token'
+    GENERATION_KEY = 'auth_token_generation'
+
+    def __init__(self, size, local_timeout, timeout):
+        self.size = size
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        return not isinstance(
+            caches[DEFAULT_CACHE_ALIAS], PROCESS_LOCAL_BACKENDS)
+
+    def get(self, key):
+        """Возвращает пару (пользователь, токен) или None."""
+        if not self.enabled:
+            return None
+        cache_key = self._get_cache_key(key)
+        generation = self.get_generation()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if (entry is not None and entry[0] == generation
+                    and entry[1] > monotonic()):
+                self._entries.move_to_end(cache_key)
+                self.stats['local_hits'] += 1
+                return self._load(key, entry[2])
+        value = cache.get(cache_key)
+        if value is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['shared_hits'] += 1
+        self._store(cache_key, generation, value)
+        return self._load(key, value)
+
+    def set(self, key, value, generation):
+        """Сохраняет пару, прочитанную из базы при поколении generation.
+
+        Если поколение с тех пор сменилось, пара могла устареть
+        до записи и не сохраняется. Поколение проверяется и после записи
+        в общий кеш: invalidate() сначала меняет поколение, а затем
+        удаляет записи, поэтому устаревшая запись удаляется либо здесь,
+        либо в invalidate()."""
+        if not self.enabled or self.get_generation() != generation:
+            return
+        cache_key = self._get_cache_key(key)
+        value = self._dump(*value)
+        cache.set(cache_key, value, self.timeout)
+        if self.get_generation() != generation:
+            cache.delete(cache_key)
+            return
+        self._store(cache_key, generation, value)
+
+    def invalidate(self, *keys):
+        """Сбрасывает записи токенов после фиксации транзакции."""
+        if not keys:
+            return
+
+        def delete():
+            cache.set(self.GENERATION_KEY, uuid4().hex, None)
+            cache.delete_many([self._get_cache_key(key) for key in keys])
+        transaction.on_commit(delete)
+
+    def get_hit_ratio(self):
+        hits = self.stats['local_hits'] + self.stats['shared_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def get_generation(self):
+        return cache.get_or_set(self.GENERATION_KEY, uuid4().hex, None)
+
+    def _store(self, cache_key, generation, value):
+        with self._lock:
+            self._entries[cache_key] = (
+                generation, monotonic() + self.local_timeout, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def _get_cache_key(self, key):
+        # Сам токен не попадает в ключи общего кеша.
+        return f'{self.KEY_PREFIX}:{sha256(key.encode()).hexdigest()}'
+
+    @staticmethod
+    def _dump(user, token):
+        return (
+            {field: getattr(user, field) for field in USER_FIELDS},
+            token.created
+        )
+
+    @staticmethod
+    def _load(key, value):
+        # Представления дописывают атрибуты к request.user, поэтому
+        # каждому запросу отдаются свои объекты.
+        user_fields, created = value
+        user = _from_fields(User, user_fields)
+        token = _from_fields(
+            Token, {'key': key, 'user_id': user.id, 'created': created})
+        token.user = user
+        return user, token
+
+
+def _from_fields(model, values):
+    """Экземпляр модели из базы, у которого загружены только поля values."""
+    fields = [field.attname for field in model._meta.concrete_fields
+              if field.attname in values]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, fields, [values[field] for field in fields])
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE,
+    settings.AUTH_TOKEN_CACHE_LOCAL_TIMEOUT,
+    settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, читающий токен и пользователя из token_cache."""
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            # Поколение читается до запроса к базе: если токен удалят
+            # или пользователя изменят, пока идет запрос, прочитанная
+            # пара не попадет в кеш.
+            generation = token_cache.get_generation()
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials, generation)
+        return credentials
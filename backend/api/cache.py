@@ -0,0 +1,86 @@
+"""Кеш ответов API для анонимных запросов чтения.
+
+Запись кеша хранит данные ответа и версии контент-тегов (recipe:<id>,
+author:<id>, tag:<slug>, ...), от которых он зависит. При изменении
+данных версии соответствующих тегов заменяются, и записи с устаревшими
+версиями перестают считаться попаданием. Подход работает поверх любого
+бэкенда кеша Django: локальной памяти в разработке и Redis на сервере.
+
+Версия тега - время изменения в наносекундах, поэтому по ней же
+строятся заголовки ETag и Last-Modified.
+"""
+from collections import Counter
+from hashlib import sha1
+from urllib.parse import urlencode
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+RESPONSE_KEY_PREFIX = 'response'
+TAG_KEY_PREFIX = 'response_tag'
+
+stats = Counter()
+
+
+def get_response_key(request):
+    """Ключ записи: путь и отсортированные параметры запроса."""
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    digest = sha1(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'{RESPONSE_KEY_PREFIX}:{digest}'
+
+
+def get_tag_versions(tags):
+    keys = {f'{TAG_KEY_PREFIX}:{tag}': tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        versions[key] = cache.get_or_set(key, time_ns(), None)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_response(request):
+    """Возвращает закешированные данные ответа или None."""
+    entry = cache.get(get_response_key(request))
+    if entry is not None and entry['versions'] == get_tag_versions(
+            entry['versions']):
+        stats['hits'] += 1
+        return entry['data']
+    stats['misses'] += 1
+    return None
+
+
+def set_response(request, data, tags, versions):
+    """Сохраняет данные ответа вместе с текущими версиями тегов.
+
+    versions - версии общих тегов, прочитанные до построения ответа.
+    Если какая-то из них с тех пор сменилась, данные могли устареть
+    еще до записи, и ответ не сохраняется."""
+    current = get_tag_versions(set(tags) | versions.keys())
+    if any(current[tag] != version for tag, version in versions.items()):
+        return
+    cache.set(
+        get_response_key(request),
+        {'versions': {tag: current[tag] for tag in tags}, 'data': data},
+        settings.RESPONSE_CACHE_TIMEOUT
+    )
+
+
+def invalidate(*tags):
+    """Сбрасывает записи, зависящие от тегов, после фиксации транзакции."""
+    def bump_versions():
+        version = time_ns()
+        cache.set_many(
+            {f'{TAG_KEY_PREFIX}:{tag}': version for tag in tags},
+            None
+        )
+    transaction.on_commit(bump_versions)
+
+
+def get_hit_ratio():
+    total = stats['hits'] + stats['misses']
+    return stats['hits'] / total if total else 0.0
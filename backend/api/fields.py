@@ -0,0 +1,136 @@
+import binascii
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework.fields import FileField, ImageField
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import ValidationError
+
+BASE64_HEADER_SEPARATOR = ';base64,'
+# Размер куска строки base64, декодируемого за один шаг.
+BASE64_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class StreamingBase64ImageField(ImageField):
+    """Поле картинки в base64 с ограниченным расходом памяти.
+
+    Размер файла проверяется по длине строки до декодирования, строка
+    декодируется кусками во временный файл, который уходит на диск после
+    SPOOL_MAX_SIZE байт, а размеры картинки читаются из заголовка до
+    декодирования пикселей.
+    """
+
+    FORMATS = {
+        'JPEG': 'jpg',
+        'PNG': 'png',
+        'GIF': 'gif',
+        'WEBP': 'webp',
+    }
+    default_error_messages = {
+        'invalid_base64': 'Картинка должна быть строкой base64.',
+        'invalid_image': 'Загрузите корректную картинку.',
+        'invalid_format': 'Допустимые форматы картинки: JPEG, PNG, GIF, WebP.',
+        'too_large': 'Размер картинки не должен превышать {max_size} Мб.',
+        'too_big': ('Стороны картинки не должны превышать '
+                    '{max_side} пикселей.'),
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        start = data.find(BASE64_HEADER_SEPARATOR)
+        start = 0 if start == -1 else start + len(BASE64_HEADER_SEPARATOR)
+
+        if (len(data) - start) * 3 // 4 > settings.IMAGE_MAX_SIZE:
+            self.fail(
+                'too_large',
+                max_size=settings.IMAGE_MAX_SIZE // (1024 * 1024)
+            )
+
+        # Файл закрывается при любой ошибке проверки, а принятую
+        # картинку закрывает сериализатор после сохранения.
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            size = self.decode(data, start, file)
+            extension = self.check_image(file)
+            file.seek(0)
+            return FileField.to_internal_value(self, UploadedFile(
+                file=file,
+                name=f'{uuid.uuid4()}.{extension}',
+                content_type=f'image/{extension}',
+                size=size
+            ))
+        except BaseException:
+            file.close()
+            raise
+
+    def decode(self, data, start, file):
+        """Декодирует base64 из data[start:] в file, возвращает размер."""
+        # Base64 может быть разбит на строки (как у base64 -w и MIME).
+        # Пробельные символы убираются из каждого куска, а символы сверх
+        # кратного 4 количества переносятся в следующий кусок.
+        remainder = ''
+        try:
+            for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = remainder + ''.join(
+                    data[offset:offset + BASE64_CHUNK_SIZE].split())
+                end = len(chunk) - len(chunk) % 4
+                file.write(binascii.a2b_base64(chunk[:end]))
+                remainder = chunk[end:]
+            if remainder:
+                file.write(binascii.a2b_base64(remainder))
+        except (binascii.Error, ValueError):
+            self.fail('invalid_base64')
+        return file.tell()
+
+    def check_image(self, file):
+        """Проверяет формат и размеры картинки по заголовку файла."""
+        try:
+            file.seek(0)
+            image = Image.open(file)
+            image_format, (width, height) = image.format, image.size
+            if image_format not in self.FORMATS:
+                self.fail('invalid_format')
+            if max(width, height) > settings.IMAGE_MAX_SIDE:
+                self.fail('too_big', max_side=settings.IMAGE_MAX_SIDE)
+            image.verify()
+        except ValidationError:
+            raise
+        except Exception:
+            self.fail('invalid_image')
+        return self.FORMATS[image_format]
+
+
+class CachedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, проверяющий id по справочнику в памяти
+    процесса (recipes.reference) без запросов к базе данных."""
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', reference.model.objects.all())
+        super().__init__(**kwargs)
+
+    def __deepcopy__(self, memo):
+        # Сериализатор копирует поля вместе с аргументами, а справочник
+        # один на процесс.
+        memo[id(self.reference)] = self.reference
+        return super().__deepcopy__(memo)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.reference.get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
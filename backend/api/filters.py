@@ -1,6 +1,7 @@
 from django_filters.rest_framework import FilterSet
 from django_filters.rest_framework import filters
 
+from recipes import search, tag_masks
 from recipes.models import (
     Ingredient,
     Recipe,
@@ -14,7 +15,7 @@ class RecipeFilter(FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
         to_field_name='slug',
-        field_name='tags__slug'
+        method='get_tags'
     )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
@@ -22,6 +23,9 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='get_search'
+    )
 
     class Meta:
         model = Recipe
@@ -29,9 +33,16 @@ class RecipeFilter(FilterSet):
             'author',
             'tags',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'search'
         )
 
+    def get_tags(self, queryset, name, value):
+        # Без параметра поле возвращает пустой QuerySet, а не пустое значение.
+        if not value:
+            return queryset
+        return tag_masks.filter_recipes(queryset, value)
+
     def get_is_favorited(self, queryset, name, value):
         if value:
             return queryset.filter(
@@ -46,6 +57,9 @@ class RecipeFilter(FilterSet):
             )
         return queryset
 
+    def get_search(self, queryset, name, value):
+        return search.search(queryset, value)
+
 
 class IngredientFilter(FilterSet):
     """Класс-фильтр для модели Ingredient."""
@@ -0,0 +1,251 @@
+import json
+import math
+import statistics
+import tempfile
+import time
+import tracemalloc
+from itertools import combinations, count, product
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFc'
+         'SJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
+FILTERS = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+MEMORY_RUNS = 3
+MAX_TAG_COMBINATIONS = 4
+# Параметр, который меняет ключ кеша ответов и игнорируется фильтрами.
+CACHE_BUSTING_PARAM = '_benchmark'
+
+
+class Command(BaseCommand):
+    help = ('Замеряет основные запросы API на данных текущей базы '
+            '(см. seed_data): медиану и 95-й перцентиль времени ответа, '
+            'число запросов к базе и пик выделенной памяти. С --baseline '
+            'сравнивает замеры с сохраненными и завершается ошибкой '
+            'при регрессии.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--output',
+            help='Файл, в который сохраняются замеры в формате JSON.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Файл с замерами, с которыми сравнивается текущий запуск.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый относительный рост времени и памяти.'
+        )
+        parser.add_argument(
+            '--filter',
+            default='',
+            help='Замерять только сценарии, в названии которых есть строка.'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация.')
+        user = self.get_user()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        token, created = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = {}
+        # Изображения созданных рецептов пишутся во временный каталог,
+        # а сами рецепты откатываются вместе с транзакцией сценария.
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(ALLOWED_HOSTS=['testserver'],
+                                      MEDIA_ROOT=media_root):
+                for name, request in self.get_scenarios(user):
+                    if options['filter'] in name:
+                        results[name] = self.measure(
+                            request, options['iterations'])
+                        self.print_result(name, results[name])
+        finally:
+            # Токен, созданный для замеров, не остается в базе.
+            if created:
+                token.delete()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def get_user(self):
+        """Пользователь с рецептами, подписками и списком покупок."""
+        user = User.objects.filter(
+            recipes__isnull=False,
+            follower__isnull=False
+        ).annotate(
+            cart_size=Count('shopping_list', distinct=True)
+        ).filter(cart_size__gt=0).order_by('-cart_size', 'id').first()
+        if user is None:
+            raise CommandError(
+                'В базе нет подходящих данных, запустите seed_data.')
+        return user
+
+    def get_scenarios(self, user):
+        recipe = Recipe.objects.filter(author=user).only('id').first()
+        tags = list(Tag.objects.values_list('id', 'slug')[:2])
+        ingredients = list(Ingredient.objects.values_list('id', 'name')[:3])
+        values = {
+            'author': [('author', user.id)],
+            'tags': [('tags', slug) for _, slug in tags],
+            'is_favorited': [('is_favorited', 1)],
+            'is_in_shopping_cart': [('is_in_shopping_cart', 1)],
+        }
+        recipe_data = {
+            'name': 'Тестовый рецепт',
+            'text': 'Описание тестового рецепта.',
+            'cooking_time': 30,
+            'image': IMAGE,
+            'tags': [tag_id for tag_id, _ in tags],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 100}
+                for ingredient_id, _ in ingredients
+            ],
+        }
+
+        yield 'recipes: anonymous', self.get(
+            self.anonymous, '/api/recipes/', bust_cache=True)
+        yield 'recipes: anonymous, cached', self.get(
+            self.anonymous, '/api/recipes/')
+        # Все сочетания фильтров RecipeFilter, включая пустое.
+        for mask in product((False, True), repeat=len(FILTERS)):
+            params = [param
+                      for name, enabled in zip(FILTERS, mask) if enabled
+                      for param in values[name]]
+            names = [name for name, enabled in zip(FILTERS, mask) if enabled]
+            yield f'recipes: {"+".join(names) or "all"}', self.get(
+                self.client, '/api/recipes/', params)
+        # Фильтр по тегам для всех наборов из первых нескольких тегов.
+        slugs = Tag.objects.order_by('id').values_list('slug', flat=True)[
+            :MAX_TAG_COMBINATIONS]
+        for size in range(1, len(slugs) + 1):
+            for combination in combinations(slugs, size):
+                yield f'recipes: tags={",".join(combination)}', self.get(
+                    self.client, '/api/recipes/',
+                    [('tags', slug) for slug in combination])
+        yield 'recipes: search', self.get(
+            self.client, '/api/recipes/',
+            [('search', ingredients[0][1].split()[0])])
+        yield 'recipe: detail', self.get(
+            self.client, f'/api/recipes/{recipe.id}/')
+        yield 'users: subscriptions', self.get(
+            self.client, '/api/users/subscriptions/', [('recipes_limit', 3)])
+        yield 'ingredients: search', self.get(
+            self.client, '/api/ingredients/',
+            [('name', ingredients[0][1][:3])])
+        yield 'recipe: create', self.write(
+            'post', '/api/recipes/', recipe_data)
+        yield 'recipe: update', self.write(
+            'patch', f'/api/recipes/{recipe.id}/', recipe_data)
+        yield 'recipes: download_shopping_cart', self.get(
+            self.client, '/api/recipes/download_shopping_cart/',
+            [('format', 'txt')])
+
+    def get(self, client, path, params=(), bust_cache=False):
+        numbers = count()
+
+        def request():
+            query = list(params)
+            if bust_cache:
+                # Каждый запрос получает свой ключ и минует кеш ответов.
+                query.append((CACHE_BUSTING_PARAM, next(numbers)))
+            response = client.get(path, query)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        return request
+
+    def write(self, method, path, data):
+        def request():
+            with transaction.atomic():
+                response = getattr(self.client, method)(
+                    path, data, format='json')
+                transaction.set_rollback(True)
+            return response
+        return request
+
+    def measure(self, request, iterations):
+        # Первый запрос прогревает кеши процесса и не учитывается.
+        self.check_response(request())
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            request()
+            timings.append(time.perf_counter() - started)
+
+        # Запросы и память замеряются отдельным прогоном: tracemalloc
+        # и сбор SQL заметно замедляют обработку. Пик памяти шумит из-за
+        # сборщика мусора, поэтому берется минимум нескольких прогонов.
+        peaks = []
+        for _ in range(MEMORY_RUNS):
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as queries:
+                request()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        peak = min(peaks)
+
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+            # Перцентиль по ближайшему рангу.
+            'p95_ms': round(
+                timings[math.ceil(0.95 * len(timings)) - 1] * 1000, 2),
+            'queries': len(queries.captured_queries),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def check_response(self, response):
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{response.request["REQUEST_METHOD"]} '
+                f'{response.request["PATH_INFO"]}: '
+                f'{response.status_code} {response.content[:500]!r}'
+            )
+
+    def print_result(self, name, result):
+        print(f'{name:<55} {result["median_ms"]:>9.2f} мс '
+              f'p95 {result["p95_ms"]:>9.2f} мс '
+              f'{result["queries"]:>4} запр. '
+              f'{result["peak_kib"]:>9.1f} КиБ')
+
+    def compare(self, results, path, tolerance):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {expected["queries"]} -> '
+                    f'{result["queries"]}')
+            for metric in ('median_ms', 'peak_kib'):
+                if result[metric] > expected[metric] * (1 + tolerance):
+                    regressions.append(
+                        f'{name}: {metric} {expected[metric]} -> '
+                        f'{result[metric]}')
+        if regressions:
+            raise CommandError(
+                'Регрессия относительно базовых замеров:\n'
+                + '\n'.join(regressions))
+        print(f'Регрессий относительно {path} нет.')
@@ -0,0 +1,178 @@
+"""Метрики запросов API в формате Prometheus.
+
+InstrumentationMiddleware замеряет для каждого представления число
+запросов к базе данных, время в базе, время сериализации и общее время
+ответа и складывает их в гистограммы процесса. Гистограммы отдаются
+представлением MetricsView по /api/_metrics; у каждого воркера свои
+значения, поэтому в метки добавлен pid процесса.
+
+Запросы к базе учитываются обработчиком execute_wrappers, который
+подключается к каждому новому соединению. Текущий запрос передается
+через contextvars и поэтому виден и в потоках пула асинхронного
+пути чтения (api.routers).
+"""
+import os
+from collections import defaultdict
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from api import cache as response_cache
+from api.authentication import token_cache
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.serialization_depth = 0
+
+
+class Histogram:
+    """Гистограмма Prometheus с накопительными корзинами."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values = defaultdict(lambda: [0] * len(buckets) + [0, 0.0])
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts = self._values[labels]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, counts in values:
+            label_text = format_labels(labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{self.name}_bucket{{{label_text},le="+Inf"}} {counts[-2]}'
+            )
+            lines.append(f'{self.name}_count{{{label_text}}} {counts[-2]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {counts[-1]}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.',
+    LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries',
+    'Число запросов к базе данных на запрос API.',
+    QUERY_BUCKETS
+)
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время запросов к базе данных на запрос API.',
+    LATENCY_BUCKETS
+)
+SERIALIZATION_DURATION = Histogram(
+    'foodgram_serialization_duration_seconds',
+    'Время сериализации ответа.',
+    LATENCY_BUCKETS
+)
+HISTOGRAMS = (
+    REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZATION_DURATION
+)
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+def observe(view, method, metrics):
+    """Записывает замеры запроса и возвращает общее время ответа."""
+    duration = perf_counter() - metrics.started
+    labels = (('view', view), ('method', method), ('pid', os.getpid()))
+    REQUEST_DURATION.observe(labels, duration)
+    DB_QUERIES.observe(labels, metrics.queries)
+    DB_DURATION.observe(labels, metrics.db_time)
+    SERIALIZATION_DURATION.observe(labels, metrics.serialization_time)
+    return duration
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    pid = format_labels((('pid', os.getpid()),))
+    counters = (
+        ('foodgram_response_cache', 'Кеш ответов для анонимных запросов.',
+         response_cache.stats),
+        ('foodgram_token_cache', 'Кеш аутентификации по токену.',
+         token_cache.stats),
+    )
+    for name, description, stats in counters:
+        lines.append(f'# HELP {name}_total {description}')
+        lines.append(f'# TYPE {name}_total counter')
+        for result, count in sorted(stats.items()):
+            lines.append(f'{name}_total{{{pid},result="{result}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class SerializationTimerMixin:
+    """Миксин сериализатора, учитывающий время to_representation.
+
+    Вложенные сериализаторы с этим миксином не учитываются повторно.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_request.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        metrics.serialization_depth += 1
+        started = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialization_depth -= 1
+            if not metrics.serialization_depth:
+                metrics.serialization_time += perf_counter() - started
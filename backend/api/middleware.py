@@ -0,0 +1,72 @@
+import cProfile
+import io
+import pstats
+
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import APIException
+
+from api import metrics
+from api.authentication import CachedTokenAuthentication
+
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_STATS_LIMIT = 60
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """Замеряет запросы к базе данных, сериализацию и время ответа.
+
+    Замеры попадают в гистограммы api.metrics и в заголовок Server-Timing.
+    Сотрудник может добавить к запросу ?_profile=1 и получить вместо ответа
+    отчет cProfile по этому запросу. Под ASGI чтение выполняется в потоках
+    пула (api.routers), поэтому профиль запроса снимается только
+    при SERVER_INTERFACE=wsgi.
+    """
+
+    def process_request(self, request):
+        request.metrics = metrics.RequestMetrics()
+        metrics.current_request.set(request.metrics)
+        if (request.GET.get(PROFILE_QUERY_PARAM) == '1'
+                and self._is_staff(request)):
+            request.profiler = cProfile.Profile()
+            request.profiler.enable()
+
+    def process_response(self, request, response):
+        request_metrics = getattr(request, 'metrics', None)
+        if request_metrics is None:
+            return response
+        metrics.current_request.set(None)
+        profiler = getattr(request, 'profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            return self._get_profile_response(profiler)
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        duration = metrics.observe(view, request.method, request_metrics)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={request_metrics.db_time * 1000:.1f};'
+            f'desc="{request_metrics.queries} queries"',
+            f'serialize;dur={request_metrics.serialization_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        return response
+
+    def _is_staff(self, request):
+        # Токен проверяется здесь же: DRF аутентифицирует запрос только
+        # внутри представления, а профилирование должно начаться раньше.
+        try:
+            credentials = CachedTokenAuthentication().authenticate(request)
+        except APIException:
+            return False
+        return credentials is not None and credentials[0].is_staff
+
+    def _get_profile_response(self, profiler):
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            PROFILE_STATS_LIMIT)
+        return HttpResponse(
+            output.getvalue(),
+            content_type='text/plain; charset=utf-8'
+        )
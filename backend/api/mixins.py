@@ -1,4 +1,12 @@
-from rest_framework import mixins, viewsets
+from hashlib import sha1
+from time import time_ns
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from api import cache as response_cache
 
 
 class CustomViewSetMixin(mixins.ListModelMixin,
@@ -6,3 +14,128 @@ class CustomViewSetMixin(mixins.ListModelMixin,
                          viewsets.GenericViewSet):
     """Класс миксин для TagViewSet и IngredientViewSet."""
     pass
+
+
+class CursorPaginationMixin:
+    """Миксин, включающий курсорную пагинацию по ?pagination=cursor.
+
+    По умолчанию используется постраничная pagination_class.
+    """
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.get_pagination_class()
+            self._paginator = (pagination_class()
+                               if pagination_class is not None else None)
+        return self._paginator
+
+    def get_pagination_class(self):
+        if (self.cursor_pagination_class is not None
+                and self.request.query_params.get('pagination') == 'cursor'):
+            return self.cursor_pagination_class
+        return self.pagination_class
+
+
+class AnonymousCacheMixin:
+    """Миксин, кеширующий ответы list и retrieve для анонимных запросов.
+
+    Вьюсет перечисляет в get_cache_tags() контент-теги ответа, по которым
+    запись сбрасывается при изменении данных, а в cache_tags - общие
+    теги, которые меняются вместе с ними. Версии общих тегов читаются
+    до обработки запроса, поэтому ответ, построенный одновременно
+    с изменением данных, не попадает в кеш.
+    """
+
+    cache_tags = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._get_cached_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cache_tags(self, data):
+        raise NotImplementedError('get_cache_tags() must be implemented.')
+
+    def _get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        data = response_cache.get_response(request)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        versions = response_cache.get_tag_versions(self.cache_tags)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set_response(
+                request,
+                response.data,
+                self.get_cache_tags(response.data),
+                versions
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """Миксин, добавляющий ETag и Last-Modified к list и retrieve.
+
+    Валидаторы строятся из версий контент-тегов conditional_tags без
+    обращения к базе данных, поэтому на совпавший If-None-Match или
+    If-Modified-Since ответ 304 отдается до сериализации. Для
+    пользовательских ответов учитывается версия user:<id>, которая
+    меняется вместе с избранным, списком покупок и подписками.
+
+    Как требует RFC 7232, при наличии If-None-Match сравнивается только
+    ETag. Версии тегов хранятся в наносекундах, а HTTP-дата - с точностью
+    до секунды, поэтому If-Modified-Since дает 304, только если последняя
+    версия строго старше переданной даты. Last-Modified - начало секунды,
+    следующей за версией, и отдается, лишь когда эта секунда наступила:
+    изменения, сделанные позже, не попадут в уже выданную секунду.
+    """
+
+    conditional_tags = ()
+    conditional_per_user = False
+
+    def list(self, request, *args, **kwargs):
+        return self._get_conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def _get_conditional_response(self, handler, request, *args, **kwargs):
+        tags = set(self.conditional_tags)
+        if self.conditional_per_user and request.user.is_authenticated:
+            tags.add(f'user:{request.user.id}')
+        versions = response_cache.get_tag_versions(tags)
+        etag = '"{}"'.format(sha1(
+            f'{response_cache.get_response_key(request)}'
+            f'{sorted(versions.items())}'.encode()
+        ).hexdigest())
+        last_modified = max(versions.values()) // 10 ** 9 + 1
+        if last_modified * 10 ** 9 > time_ns():
+            last_modified = None
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.conditional_per_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
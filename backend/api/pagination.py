@@ -1,7 +1,130 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes import feed
+
+
+def approximate_count(queryset):
+    """Оценка числа строк по плану запроса PostgreSQL без COUNT(*).
+
+    На остальных СУБД возвращает точное значение.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
 
 
 class CustomPaginator(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = settings.PAGE_SIZE
+
+
+class CustomCursorPaginator(CursorPagination):
+    """Курсорная пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    С параметром ?count=approximate в ответ добавляется оценка
+    общего числа объектов.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = settings.PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+
+class SubscriptionCursorPaginator(CustomCursorPaginator):
+    ordering = ('id',)
+
+
+class FeedCursorPaginator(BasePagination):
+    """Курсорная пагинация ленты подписок по (pub_date, id рецепта).
+
+    Лента листается только вперед: курсор следующей страницы указывает
+    на последний рецепт текущей.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_feed(self, request):
+        """Возвращает пары (pub_date, id рецепта) страницы ленты."""
+        self.request = request
+        limit = self.get_page_size(request)
+        rows = feed.get_page(
+            request.user.id, self.decode_cursor(request), limit + 1)
+        self.has_next = len(rows) > limit
+        self.page = rows[:limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, recipe_id = self.page[-1]
+        cursor = urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{recipe_id}'.encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            pub_date, recipe_id = urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            position = (parse_datetime(pub_date), int(recipe_id))
+        except (DecodeError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
@@ -0,0 +1,88 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер выгрузки списка покупок.
+
+    Сам список отдается потоком через stream(), render() используется
+    только для ответов с ошибками.
+    """
+
+    charset = 'utf-8'
+    filename = 'shopping_list'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return ''
+        return json.dumps(data, ensure_ascii=False)
+
+    def stream(self, ingredients):
+        raise NotImplementedError('stream() must be implemented.')
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        separator = ''
+        for ingredient in ingredients:
+            yield (f"{separator}{ingredient['ingredient__name']} - "
+                   f"{ingredient['ingredient__measurement_unit']} | "
+                   f"{ingredient['amount']}")
+            separator = '\n'
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('Ингредиент', 'Единица измерения', 'Количество')
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['amount']
+            ))
+
+
+class ShoppingListJSONRenderer(JSONRenderer):
+    filename = 'shopping_list'
+
+    def stream(self, ingredients):
+        separator = ''
+        yield '['
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'amount': ingredient['amount']
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Рендерер метрик в текстовом формате Prometheus."""
+
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data
+        return json.dumps(data, ensure_ascii=False)
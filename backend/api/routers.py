@@ -0,0 +1,66 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.routers import DefaultRouter
+
+from foodgram.db import schedule_health_checks
+
+
+def async_read_view(view):
+    """Асинхронная обертка представления вьюсета для ASGI.
+
+    Под ASGI синхронные представления Django 3.2 выполняются по очереди
+    в одном потоке воркера. Обертка выполняет чтение в общем пуле потоков,
+    поэтому ожидание базы данных одним запросом не задерживает остальные.
+    Запись идет прежним последовательным путем.
+    """
+    read = sync_to_async(_read, thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return update_wrapper(wrapper, view)
+
+
+def _read(view, request, *args, **kwargs):
+    # Соединения Django привязаны к потоку, поэтому пометка для проверки,
+    # рендеринг ответа и закрытие соединения выполняются в том же потоке
+    # пула, что и запросы к базе данных.
+    close_old_connections()
+    schedule_health_checks()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+class AsyncReadRouter(DefaultRouter):
+    """Роутер, который при SERVER_INTERFACE=asgi подключает вьюсеты
+    с async_read = True через async_read_view."""
+
+    def get_urls(self):
+        urls = super().get_urls()
+        if settings.SERVER_INTERFACE != 'asgi':
+            return urls
+        return [self._get_async_url(url) for url in urls]
+
+    def _get_async_url(self, url):
+        viewset = getattr(url.callback, 'cls', None)
+        if not getattr(viewset, 'async_read', False):
+            return url
+        return URLPattern(
+            url.pattern,
+            async_read_view(url.callback),
+            url.default_args,
+            url.name
+        )
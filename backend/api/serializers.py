@@ -1,13 +1,27 @@
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.serializers import (
+    Field,
+    FloatField,
+    IntegerField,
+    ListField,
     ModelSerializer,
-    PrimaryKeyRelatedField,
     ReadOnlyField,
-    SerializerMethodField
+    Serializer,
+    SerializerMethodField,
+    ValidationError
 )
 
+from api.fields import (
+    CachedPrimaryKeyRelatedField,
+    StreamingBase64ImageField
+)
+from api.metrics import SerializationTimerMixin
+from recipes import shopping_list
+from recipes.images import VARIANTS
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -16,16 +30,17 @@ from recipes.models import (
     ShoppingList,
     Tag
 )
-from users.models import Subscription, User
+from recipes.reference import ingredient_cache, tag_cache
+from users.models import Subscription, User, UserCounters
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(SerializationTimerMixin, ModelSerializer):
     class Meta:
         model = Tag
-        fields = '__all__'
+        exclude = ('bit',)
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(SerializationTimerMixin, ModelSerializer):
     class Meta:
         model = Ingredient
         fields = '__all__'
@@ -56,8 +71,8 @@ class IngredientInRecipeSerializer(ModelSerializer):
 
 class CreateIngredientSerializer(ModelSerializer):
     """Сериализатор создания списка ингредиентов с количеством для рецепта."""
-    id = PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+    id = CachedPrimaryKeyRelatedField(
+        reference=ingredient_cache
     )
 
     class Meta:
@@ -68,10 +83,41 @@ class CreateIngredientSerializer(ModelSerializer):
         )
 
 
-class RecipeMinifiedSerializer(ModelSerializer):
+class ImageVariantsField(Field):
+    """Ссылки на уменьшенные копии картинки рецепта.
+
+    Пока копии не построены фоновой обработкой, возвращает None.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.has_image_variants():
+            return None
+        request = self.context.get('request')
+        return {
+            variant: {
+                extension: self.get_url(path, request)
+                for extension, path in recipe.image_variants[variant].items()
+            }
+            for variant in VARIANTS
+        }
+
+    def get_url(self, path, request):
+        url = default_storage.url(path)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class RecipeMinifiedSerializer(SerializationTimerMixin, ModelSerializer):
     """Упрощенный сериализатор рецептов."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -79,6 +125,7 @@ class RecipeMinifiedSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
 
@@ -98,7 +145,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SerializationTimerMixin, UserSerializer):
     """Cериализатор пользователя."""
 
     is_subscribed = SerializerMethodField(
@@ -119,13 +166,15 @@ class CustomUserSerializer(UserSerializer):
     lookup_field = 'username'
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and Subscription.objects.filter(
                     user=user, author=obj.id).exists())
 
 
-class SubscriptionSerializer(ModelSerializer):
+class SubscriptionSerializer(SerializationTimerMixin, ModelSerializer):
     """Cериализатор подписчиков."""
 
     id = ReadOnlyField(
@@ -157,28 +206,36 @@ class SubscriptionSerializer(ModelSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            queryset = obj.author.recipes.all()[:int(recipes_limit)]
+        if hasattr(obj, 'author_recipes'):
+            queryset = obj.author_recipes
         else:
-            queryset = obj.author.recipes.all()
+            request = self.context.get('request')
+            recipes_limit = request.query_params.get('recipes_limit')
+            if recipes_limit:
+                queryset = obj.author.recipes.all()[:int(recipes_limit)]
+            else:
+                queryset = obj.author.recipes.all()
         return RecipeMinifiedSerializer(
             queryset,
             many=True
         ).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        try:
+            return obj.author.counters.recipes_count
+        except UserCounters.DoesNotExist:
+            return Recipe.objects.filter(author=obj.author).count()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and Subscription.objects.filter(
-                    user=user, author=obj.id).exists())
+                    user=user, author=obj.author_id).exists())
 
 
-class GetRecipeListSerializer(ModelSerializer):
+class GetRecipeListSerializer(SerializationTimerMixin, ModelSerializer):
     """Cериализатор чтения рецептов."""
 
     author = CustomUserSerializer(
@@ -189,6 +246,7 @@ class GetRecipeListSerializer(ModelSerializer):
         many=True
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     ingredients = IngredientInRecipeSerializer(
@@ -205,6 +263,7 @@ class GetRecipeListSerializer(ModelSerializer):
             'ingredients',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
             'is_favorited',
@@ -226,27 +285,64 @@ class GetRecipeListSerializer(ModelSerializer):
         ).data
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.shopping_list.filter(user=user).exists())
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.favorites.filter(user=user).exists())
 
+    def to_representation(self, instance):
+        # Флаг подписки аннотирован на рецепте в RecipeViewSet.get_queryset,
+        # передаем его автору, чтобы не делать запрос на каждую строку.
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
+
+class CookableRecipeSerializer(GetRecipeListSerializer):
+    """Сериализатор рецептов с долей ингредиентов, которые есть у
+    пользователя."""
+
+    coverage = FloatField(
+        read_only=True
+    )
+
+    class Meta(GetRecipeListSerializer.Meta):
+        fields = GetRecipeListSerializer.Meta.fields + ('coverage',)
+
+
+class CookableQuerySerializer(Serializer):
+    """Сериализатор параметров поиска рецептов по ингредиентам."""
+
+    ingredients = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False
+    )
+    min_coverage = FloatField(
+        min_value=0,
+        max_value=1,
+        default=0
+    )
+
 
 class CreateRecipeSerializer(ModelSerializer):
     """Сериализатор создания, изменения и удаления рецептов."""
 
-    tags = PrimaryKeyRelatedField(
+    tags = CachedPrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        reference=tag_cache
     )
     ingredients = CreateIngredientSerializer(
         many=True
     )
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -260,16 +356,69 @@ class CreateRecipeSerializer(ModelSerializer):
             'cooking_time'
         )
 
-    def create_tags(self, tags, recipe):
-        recipe.tags.add(*tags)
+    def validate_ingredients(self, value):
+        ingredient_ids = [ingredient['id'].id for ingredient in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise ValidationError('Ингредиенты не должны повторяться.')
+        return value
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientInRecipe.objects.get_or_create(
-                recipe=recipe,
-                ingredient=ingredient['id'],
-                amount=ingredient['amount']
-            )
+        IngredientInRecipe.objects.bulk_create(
+            [IngredientInRecipe(recipe=recipe,
+                                ingredient=ingredient['id'],
+                                amount=ingredient['amount'])
+             for ingredient in ingredients]
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к ingredients тремя запросами:
+        вставкой новых, обновлением количества и удалением лишних.
+
+        Возвращает прежний состав {id ингредиента: количество}.
+        """
+        existing = {
+            row.ingredient_id: row
+            for row in recipe.recipe_ingredient.all()
+        }
+        old_amounts = {
+            ingredient_id: row.amount
+            for ingredient_id, row in existing.items()
+        }
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+
+        removed = [row.id for ingredient_id, row in existing.items()
+                   if ingredient_id not in new_amounts]
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+
+        changed = []
+        for ingredient_id, row in existing.items():
+            amount = new_amounts.get(ingredient_id, row.amount)
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+
+        IngredientInRecipe.objects.bulk_create(
+            [IngredientInRecipe(recipe=recipe,
+                                ingredient_id=ingredient_id,
+                                amount=amount)
+             for ingredient_id, amount in new_amounts.items()
+             if ingredient_id not in existing]
+        )
+        return old_amounts
+
+    def save(self, **kwargs):
+        image = self.validated_data.get('image')
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Временный файл картинки не нужен после записи в хранилище.
+            if image is not None:
+                image.close()
 
     @transaction.atomic
     def create(self, validated_data):
@@ -277,21 +426,34 @@ class CreateRecipeSerializer(ModelSerializer):
         tags_list = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(ingredients_list, recipe)
-        self.create_tags(tags_list, recipe)
+        recipe.tags.set(tags_list)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredients.clear()
         tags_list = validated_data.pop('tags')
         ingredients_list = validated_data.pop('ingredients')
         instance.tags.set(tags_list)
-        self.create_ingredients(ingredients_list, instance)
-        self.create_tags(tags_list, instance)
+        old_amounts = self.update_ingredients(ingredients_list, instance)
+        shopping_list.update_recipe(
+            instance.id,
+            old_amounts,
+            {ingredient['id'].id: ingredient['amount']
+             for ingredient in ingredients_list}
+        )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        # Без предвыборки ответ загружал бы ингредиенты по одному.
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient')
+            )
+        )
         return GetRecipeListSerializer(
             instance,
             context={'request': self.context.get('request')}
@@ -325,6 +487,12 @@ class ShoppingListSerializer(ModelSerializer):
             'recipe'
         )
 
+    @transaction.atomic
+    def create(self, validated_data):
+        # Агрегат ингредиентов обновляет сигнал post_save: строка списка
+        # и ее количества сохраняются вместе или не сохраняются вовсе.
+        return super().create(validated_data)
+
     def to_representation(self, instance):
         return RecipeMinifiedSerializer(
             instance.recipe,
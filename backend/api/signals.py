@@ -0,0 +1,131 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api import cache as response_cache
+from api.authentication import token_cache
+from recipes.changes import data_changed
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from users.models import Subscription, User
+
+# Поля автора, которые выводятся в рецептах.
+AUTHOR_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+# Контент-теги кеша ответов для изменений в обход сигналов моделей:
+# общий тег модели и префикс тегов отдельных объектов.
+MODEL_CACHE_TAGS = {
+    Recipe: ('recipes', 'recipe'),
+    Tag: ('tags', 'tag'),
+    Ingredient: ('ingredients', None),
+    User: ('authors', 'author'),
+}
+
+
+@receiver(data_changed)
+def invalidate_changed_data(sender, pks=None, **kwargs):
+    tag, prefix = MODEL_CACHE_TAGS[sender]
+    object_tags = [f'{prefix}:{pk}' for pk in pks or () if prefix]
+    response_cache.invalidate(tag, *object_tags)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    response_cache.invalidate(f'recipe:{instance.id}', 'recipes')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, reverse, pk_set, **kwargs):
+    if kwargs['action'].startswith('pre_'):
+        return
+    if not reverse:
+        response_cache.invalidate(f'recipe:{instance.id}', 'recipes')
+    else:
+        response_cache.invalidate(
+            'recipes', *(f'recipe:{pk}' for pk in pk_set or ()))
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    response_cache.invalidate(f'recipe:{instance.recipe_id}', 'recipes')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    response_cache.invalidate(f'tag:{instance.id}', 'tags')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient(sender, instance, **kwargs):
+    response_cache.invalidate('ingredients')
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or update_fields is not None:
+        return
+    instance._saved_author_fields = User.objects.filter(
+        pk=instance.pk).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields=None,
+                      **kwargs):
+    # У нового пользователя еще нет рецептов, а вход, смена пароля
+    # и другие поля профиля не меняют данные автора в списках рецептов.
+    if created:
+        return
+    if update_fields is not None:
+        changed = bool(set(AUTHOR_FIELDS) & set(update_fields))
+    else:
+        changed = instance._saved_author_fields != tuple(
+            getattr(instance, field) for field in AUTHOR_FIELDS)
+    if changed:
+        response_cache.invalidate(f'author:{instance.id}', 'authors')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author(sender, instance, **kwargs):
+    response_cache.invalidate(f'author:{instance.id}', 'authors')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user_state(sender, instance, **kwargs):
+    response_cache.invalidate(f'user:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Закешированный пользователь должен сразу отражать деактивацию,
+    # смену пароля и данных профиля.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    token_cache.invalidate(
+        *Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
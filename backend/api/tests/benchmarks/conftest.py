@@ -0,0 +1,138 @@
+"""Нагрузочные замеры API на данных seed_data.
+
+Замеры не входят в обычный прогон тестов и запускаются отдельно:
+
+    pytest -m slow --benchmark-autosave
+    pytest -m slow --benchmark-compare --benchmark-compare-fail=median:25%
+
+Объем данных задается переменной окружения BENCHMARK_RECIPES,
+остальные таблицы заполняются пропорционально. Время ответа сравнивается
+с сохраненным прогоном средствами pytest-benchmark, число запросов
+к базе ограничено в каждом замере, а пик выделенной памяти и число
+запросов попадают в extra_info отчета.
+"""
+import os
+import tracemalloc
+from itertools import count
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_api import (
+    CACHE_BUSTING_PARAM,
+    IMAGE
+)
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+BENCHMARK_RECIPES = int(os.environ.get('BENCHMARK_RECIPES', 100000))
+
+
+@pytest.fixture(scope='session')
+def seeded_db(django_db_setup, django_db_blocker, tmp_path_factory):
+    media_root = tmp_path_factory.mktemp('media')
+    with django_db_blocker.unblock(), override_settings(
+            MEDIA_ROOT=media_root):
+        call_command(
+            'seed_data',
+            users=max(BENCHMARK_RECIPES // 20, 2),
+            recipes=BENCHMARK_RECIPES,
+            favorites=BENCHMARK_RECIPES * 2,
+            carts=BENCHMARK_RECIPES // 5,
+            subscriptions=BENCHMARK_RECIPES // 5,
+            seed=1
+        )
+
+
+@pytest.fixture
+def bench_user(seeded_db):
+    """Пользователь с рецептами, подписками и самым большим списком
+    покупок."""
+    return User.objects.filter(
+        recipes__isnull=False,
+        follower__isnull=False
+    ).annotate(
+        cart_size=Count('shopping_list', distinct=True)
+    ).filter(cart_size__gt=0).order_by('-cart_size', 'id').first()
+
+
+@pytest.fixture
+def bench_client(bench_user):
+    client = APIClient()
+    client.force_authenticate(bench_user)
+    return client
+
+
+@pytest.fixture
+def recipe_data(seeded_db):
+    return {
+        'name': 'Тестовый рецепт',
+        'text': 'Описание тестового рецепта.',
+        'cooking_time': 30,
+        'image': IMAGE,
+        'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 100}
+            for ingredient_id in Ingredient.objects.values_list(
+                'id', flat=True)[:10]
+        ],
+    }
+
+
+@pytest.fixture
+def measure(benchmark, django_assert_max_num_queries):
+    """Замеряет request() и проверяет, что он укладывается
+    в max_queries запросов к базе."""
+    def measure(request, max_queries):
+        response = request()
+        assert response.status_code < 400, response.content[:500]
+
+        tracemalloc.start()
+        try:
+            with django_assert_max_num_queries(max_queries) as queries:
+                request()
+            benchmark.extra_info['peak_kib'] = round(
+                tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['queries'] = len(queries.captured_queries)
+        return benchmark(request)
+    return measure
+
+
+@pytest.fixture
+def api_get():
+    """Возвращает функцию GET-запроса, которая дочитывает потоковый
+    ответ и с bust_cache каждый раз обходит кеш ответов."""
+    def api_get(client, path, params=(), bust_cache=False):
+        numbers = count()
+
+        def request():
+            query = list(params)
+            if bust_cache:
+                query.append((CACHE_BUSTING_PARAM, next(numbers)))
+            response = client.get(path, query)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        return request
+    return api_get
+
+
+@pytest.fixture
+def api_write():
+    """Возвращает функцию запроса на запись, изменения которого
+    откатываются, чтобы каждый замер начинался с тех же данных."""
+    def api_write(client, method, path, data):
+        def request():
+            with transaction.atomic():
+                response = getattr(client, method)(
+                    path, data, format='json')
+                transaction.set_rollback(True)
+            return response
+        return request
+    return api_write
@@ -0,0 +1,122 @@
+from itertools import product
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_api import FILTERS
+from recipes.models import Ingredient, Recipe, Tag
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+# Страница списка: COUNT(*), рецепты и предвыборки тегов и ингредиентов.
+LIST_QUERIES = 4
+
+
+@pytest.fixture
+def filter_values(bench_user):
+    return {
+        'author': [('author', bench_user.id)],
+        'tags': [('tags', slug) for slug in Tag.objects.order_by(
+            'id').values_list('slug', flat=True)[:2]],
+        'is_favorited': [('is_favorited', 1)],
+        'is_in_shopping_cart': [('is_in_shopping_cart', 1)],
+    }
+
+
+def test_anonymous_recipe_list(seeded_db, measure, api_get):
+    measure(
+        api_get(APIClient(), '/api/recipes/', bust_cache=True),
+        LIST_QUERIES
+    )
+
+
+def test_anonymous_recipe_list_cached(seeded_db, measure, api_get):
+    measure(api_get(APIClient(), '/api/recipes/'), 0)
+
+
+@pytest.mark.parametrize(
+    'enabled',
+    list(product((False, True), repeat=len(FILTERS))),
+    ids=lambda enabled: '+'.join(
+        name for name, on in zip(FILTERS, enabled) if on) or 'all'
+)
+def test_recipe_list_filters(bench_client, filter_values, enabled, measure,
+                             api_get):
+    names = [name for name, on in zip(FILTERS, enabled) if on]
+    params = [param for name in names for param in filter_values[name]]
+    # Значения author и tags проверяются отдельными запросами.
+    max_queries = LIST_QUERIES + len({'author', 'tags'} & set(names))
+    measure(api_get(bench_client, '/api/recipes/', params), max_queries)
+
+
+def test_recipe_detail(bench_client, bench_user, measure, api_get):
+    recipe = Recipe.objects.filter(author=bench_user).first()
+    measure(api_get(bench_client, f'/api/recipes/{recipe.id}/'), 3)
+
+
+def test_subscriptions(bench_client, measure, api_get):
+    measure(
+        api_get(bench_client, '/api/users/subscriptions/',
+                [('recipes_limit', 3)]),
+        3
+    )
+
+
+def test_ingredient_search(bench_client, measure, api_get):
+    measure(
+        api_get(bench_client, '/api/ingredients/', [('name', 'сол')]),
+        0
+    )
+
+
+@pytest.fixture
+def updated_recipe(bench_client, recipe_data):
+    """Рецепт пользователя с известным составом, который есть в его
+    избранном и списке покупок: число запросов на изменение не зависит
+    от случайных данных seed_data."""
+    response = bench_client.post('/api/recipes/', recipe_data, format='json')
+    recipe_id = response.data['id']
+    bench_client.post(f'/api/recipes/{recipe_id}/favorite/')
+    bench_client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+    return recipe_id
+
+
+def test_recipe_create(bench_client, recipe_data, measure, benchmark,
+                       api_write):
+    benchmark.group = 'recipe writes'
+    measure(
+        api_write(bench_client, 'post', '/api/recipes/', recipe_data), 18)
+
+
+def test_recipe_update(bench_client, updated_recipe, recipe_data, measure,
+                       benchmark, api_write):
+    benchmark.group = 'recipe writes'
+    # Состав меняется целиком: другие теги и ингредиенты.
+    data = {
+        **recipe_data,
+        'tags': list(Tag.objects.order_by('-id').values_list(
+            'id', flat=True)[:2]),
+        'ingredients': [
+            {'id': ingredient['id'], 'amount': 50}
+            for ingredient in recipe_data['ingredients'][5:]
+        ] + [
+            {'id': ingredient_id, 'amount': 50}
+            for ingredient_id in Ingredient.objects.order_by(
+                '-id').values_list('id', flat=True)[:5]
+        ],
+    }
+    # Теги и ингредиенты удаляются и добавляются, списки покупок
+    # и маска тегов пересчитываются.
+    measure(
+        api_write(bench_client, 'patch', f'/api/recipes/{updated_recipe}/',
+                  data),
+        28
+    )
+
+
+def test_download_shopping_cart(bench_client, measure, api_get):
+    measure(
+        api_get(bench_client, '/api/recipes/download_shopping_cart/',
+                [('format', 'txt')]),
+        1
+    )
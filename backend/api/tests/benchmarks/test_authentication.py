@@ -0,0 +1,27 @@
+import pytest
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api import authentication
+from api.authentication import CachedTokenAuthentication
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+
+@pytest.fixture
+def token(bench_user, monkeypatch):
+    # LocMemCache тестов считается общим, иначе кеш токенов отключен.
+    monkeypatch.setattr(authentication, 'PROCESS_LOCAL_BACKENDS', ())
+    return Token.objects.get_or_create(user=bench_user)[0]
+
+
+@pytest.mark.parametrize(
+    'authentication_class',
+    (TokenAuthentication, CachedTokenAuthentication),
+    ids=('database', 'cached')
+)
+def test_token_authentication(token, authentication_class, benchmark):
+    benchmark.group = 'token authentication'
+    user, _ = benchmark(
+        authentication_class().authenticate_credentials, token.key)
+    assert user.id == token.user_id
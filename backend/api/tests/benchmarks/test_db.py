@@ -0,0 +1,25 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+
+# Внутри транзакции теста соединение не проверяется, поэтому цена
+# проверки замеряется отдельно и сравнивается с самым коротким
+# некешированным запросом API: проверка добавляет к нему один SELECT 1.
+def test_recipe_detail_request(seeded_db, measure, benchmark, api_get):
+    benchmark.group = 'connection health check'
+    recipe_id = Recipe.objects.order_by('id').values_list(
+        'id', flat=True).first()
+    measure(
+        api_get(APIClient(), f'/api/recipes/{recipe_id}/', bust_cache=True),
+        4
+    )
+
+
+def test_connection_health_check(seeded_db, benchmark):
+    benchmark.group = 'connection health check'
+    assert benchmark(connection.is_usable)
@@ -0,0 +1,57 @@
+import pytest
+from django.conf import settings
+from rest_framework.test import APIClient
+
+from api.tests.conftest import create_user
+from recipes import feed
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+FOLLOWING = (10, 100, 1000)
+
+
+@pytest.fixture(params=FOLLOWING, ids=lambda count: f'{count} authors')
+def reader(request, seeded_db):
+    """Пользователь, подписанный на request.param авторов с рецептами."""
+    author_ids = list(User.objects.filter(
+        recipes__isnull=False).distinct().values_list('id', flat=True)[
+        :request.param])
+    if len(author_ids) < request.param:
+        pytest.skip(f'В наборе меньше {request.param} авторов.')
+    user = create_user('feed_reader')
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author_id=author_id)
+        for author_id in author_ids
+    )
+    for author_id in author_ids:
+        feed.follow(user.id, author_id)
+    return user
+
+
+def test_feed_page(reader, benchmark):
+    benchmark.group = f'feed: {reader.follower.count()} authors'
+    page = benchmark(feed.get_page, reader.id)
+    assert len(page) == settings.PAGE_SIZE
+
+
+def test_naive_feed_page(reader, benchmark):
+    """Прежний способ: рецепты авторов из подписок по pub_date."""
+    benchmark.group = f'feed: {reader.follower.count()} authors'
+
+    def get_page():
+        return list(Recipe.objects.filter(
+            author__in=Subscription.objects.filter(
+                user=reader).values('author')
+        ).order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id')[:settings.PAGE_SIZE])
+
+    assert benchmark(get_page) == feed.get_page(reader.id)
+
+
+def test_feed_endpoint(reader, measure, api_get):
+    client = APIClient()
+    client.force_authenticate(reader)
+    # Страница ленты, рецепты страницы и две предвыборки.
+    measure(api_get(client, '/api/recipes/feed/'), 5)
@@ -0,0 +1,64 @@
+import base64
+import io
+
+import pytest
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw
+from rest_framework.test import APIClient
+
+from recipes.images import build_variants
+from recipes.management.commands.seed_data import Command as SeedCommand
+from recipes.models import Recipe
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+PAGE_SIZE = 6
+
+
+@pytest.fixture
+def photo_data(recipe_data):
+    """Данные рецепта с фотографией 2400x1600 в base64."""
+    image = Image.new('RGB', (2400, 1600), '#E26C2D')
+    draw = ImageDraw.Draw(image)
+    for offset in range(0, 2400, 40):
+        draw.line((offset, 0, 2400 - offset, 1600), fill='#49B64E', width=3)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return {
+        **recipe_data,
+        'image': ('data:image/jpeg;base64,'
+                  + base64.b64encode(buffer.getvalue()).decode()),
+    }
+
+
+@pytest.fixture
+def recipes_with_variants(seeded_db):
+    """Варианты картинки seed_data у всех рецептов набора."""
+    image_name = SeedCommand().get_image()
+    Recipe.objects.filter(image=image_name).update(
+        image_variants=build_variants(image_name))
+
+
+def test_recipe_upload(bench_client, photo_data, measure, api_write):
+    # Ответ не ждет уменьшенных копий: их строит пул после фиксации.
+    measure(
+        api_write(bench_client, 'post', '/api/recipes/', photo_data), 18)
+
+
+def test_recipe_list_page_bytes(recipes_with_variants, measure, benchmark,
+                                api_get):
+    request = api_get(
+        APIClient(), '/api/recipes/', [('limit', PAGE_SIZE)],
+        bust_cache=True)
+    response = measure(request, 4)
+
+    recipes = Recipe.objects.filter(
+        pk__in=[recipe['id'] for recipe in response.json()['results']])
+    benchmark.extra_info['json_bytes'] = len(response.content)
+    benchmark.extra_info['image_bytes'] = sum(
+        default_storage.size(recipe.image.name) for recipe in recipes)
+    benchmark.extra_info['card_webp_bytes'] = sum(
+        default_storage.size(recipe.image_variants['card']['webp'])
+        for recipe in recipes)
+    assert (benchmark.extra_info['card_webp_bytes']
+            < benchmark.extra_info['image_bytes'] / 4)
@@ -0,0 +1,45 @@
+import math
+
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+# Целевое время ответа поиска на наборе из 100 тысяч рецептов.
+SEARCH_MEDIAN_TARGET_MS = 100
+SEARCH_P95_TARGET_MS = 200
+
+
+@pytest.fixture
+def search_queries(seeded_db):
+    """Запросы из слов случайного рецепта: частое слово названия
+    и редкое сочетание слов названия и описания."""
+    recipe = Recipe.objects.order_by('id').first()
+    name_word = recipe.name.split()[0]
+    text_word = recipe.text.split()[-2]
+    return {
+        'one word': name_word,
+        'two words': f'{name_word} {text_word}',
+    }
+
+
+@pytest.mark.parametrize('kind', ('one word', 'two words'))
+def test_recipe_search_latency(search_queries, kind, measure, benchmark,
+                               api_get):
+    # Анонимный запрос: результаты не зависят от флагов пользователя,
+    # а параметр обхода кеша заставляет каждый раз искать заново.
+    measure(
+        api_get(APIClient(), '/api/recipes/',
+                [('search', search_queries[kind])], bust_cache=True),
+        4
+    )
+    if benchmark.disabled:
+        return
+    timings = sorted(benchmark.stats.stats.data)
+    median_ms = benchmark.stats.stats.median * 1000
+    p95_ms = timings[math.ceil(0.95 * len(timings)) - 1] * 1000
+    benchmark.extra_info['p95_ms'] = round(p95_ms, 2)
+    assert median_ms < SEARCH_MEDIAN_TARGET_MS
+    assert p95_ms < SEARCH_P95_TARGET_MS
@@ -0,0 +1,51 @@
+import resource
+
+import pytest
+from django.db.models import Sum
+from rest_framework.test import APIClient
+
+from api.tests.conftest import create_user
+from recipes import shopping_list
+from recipes.models import IngredientInRecipe, Recipe, ShoppingList
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+CART_RECIPES = 5000
+
+
+@pytest.fixture
+def large_cart_client(seeded_db):
+    """Клиент пользователя, у которого в списке покупок тысячи рецептов."""
+    user = create_user('large_cart')
+    recipe_ids = list(
+        Recipe.objects.values_list('id', flat=True)[:CART_RECIPES])
+    ShoppingList.objects.bulk_create(
+        ShoppingList(user=user, recipe_id=recipe_id)
+        for recipe_id in recipe_ids
+    )
+    shopping_list.apply_delta([user.id], dict(
+        IngredientInRecipe.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('ingredient').annotate(amount=Sum('amount')).order_by()
+    ))
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.parametrize('export_format', ('txt', 'csv', 'json'))
+def test_download_large_shopping_cart(large_cart_client, export_format,
+                                      measure, benchmark, api_get):
+    request = api_get(
+        large_cart_client,
+        '/api/recipes/download_shopping_cart/',
+        [('format', export_format)]
+    )
+    # Высшая отметка RSS процесса: растет, только если выгрузка
+    # потребовала больше памяти, чем весь предыдущий прогон.
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    measure(request, 1)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    benchmark.extra_info['cart_recipes'] = CART_RECIPES
+    benchmark.extra_info['peak_rss_kib'] = rss_after
+    benchmark.extra_info['peak_rss_growth_kib'] = rss_after - rss_before
@@ -0,0 +1,21 @@
+import pytest
+
+from api.tests.benchmarks.conftest import BENCHMARK_RECIPES
+from recipes import similarity
+from recipes.models import SimilarRecipe
+
+pytestmark = [pytest.mark.slow, pytest.mark.django_db]
+
+# Пересчет для набора из 100 тысяч рецептов должен укладываться
+# в несколько минут ночного задания.
+BUILD_TARGET_S = 120 * BENCHMARK_RECIPES / 100000
+
+
+def test_build_similar_recipes(seeded_db, benchmark):
+    recipes, written = benchmark.pedantic(
+        similarity.build, rounds=3, iterations=1)
+    benchmark.extra_info['recipes'] = recipes
+    benchmark.extra_info['rows'] = written
+    assert SimilarRecipe.objects.count() == written
+    if not benchmark.disabled:
+        assert benchmark.stats.stats.median < BUILD_TARGET_S
@@ -0,0 +1,131 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from recipes.reference import ingredient_cache, tag_cache
+from users.models import Subscription, User
+
+IMAGE = 'recipes/images/test.png'
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def feed_workers(settings):
+    # Ленты обновляются синхронно: фоновый поток не видит данных
+    # незафиксированной транзакции теста.
+    settings.FEED_WORKERS = 0
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Версии кешей процесса хранятся в кеше Django, поэтому после
+    # очистки справочники и индексы перечитываются из базы теста.
+    cache.clear()
+    tag_cache.expire()
+    ingredient_cache.expire()
+    yield
+    cache.clear()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password',
+        first_name='Имя',
+        last_name='Фамилия'
+    )
+
+
+def create_recipe(author, tags, ingredients, name='Рецепт'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        image=IMAGE,
+        cooking_time=10
+    )
+    recipe.tags.set(tags)
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+@pytest.fixture
+def user():
+    return create_user('user')
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(
+            name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(30)
+    ]
+
+
+@pytest.fixture
+def authors():
+    return [create_user(f'author{number}') for number in range(12)]
+
+
+@pytest.fixture
+def recipes(user, authors, tags, ingredients):
+    """По два рецепта у каждого автора, часть из них в избранном,
+    в списке покупок и от авторов, на которых подписан user."""
+    recipes = [
+        create_recipe(
+            author,
+            tags[:number % len(tags) + 1],
+            ingredients[number:number + 3],
+            name=f'Рецепт {number}'
+        )
+        for number, author in enumerate(authors * 2)
+    ]
+    for recipe in recipes[::2]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    for recipe in recipes[::3]:
+        ShoppingList.objects.create(user=user, recipe=recipe)
+    for author in authors:
+        Subscription.objects.create(user=user, author=author)
+    return recipes
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
@@ -0,0 +1,20 @@
+import pytest
+
+from users.models import UserCounters
+
+pytestmark = pytest.mark.django_db
+
+
+def test_user_changelist_without_counters(admin_client, authors, recipes):
+    author = authors[0]
+    UserCounters.objects.filter(user=author).delete()
+
+    response = admin_client.get(
+        '/admin/auth/user/', {'q': author.username})
+
+    assert response.status_code == 200
+    row = next(result for result in response.context['cl'].result_list
+               if result.pk == author.pk)
+    model_admin = response.context['cl'].model_admin
+    assert model_admin.recipes_count(row) == 2
+    assert model_admin.followers_count(row) == 1
@@ -0,0 +1,80 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication
+from api.authentication import CachedTokenAuthentication, token_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(monkeypatch):
+    # LocMemCache тестов считается общим, иначе кеш токенов отключен.
+    monkeypatch.setattr(authentication, 'PROCESS_LOCAL_BACKENDS', ())
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def test_credentials_changed_during_lookup_are_not_cached(
+        token, monkeypatch, django_capture_on_commit_callbacks):
+    authenticate_credentials = TokenAuthentication.authenticate_credentials
+
+    def authenticate_and_change(self, key):
+        credentials = authenticate_credentials(self, key)
+        # Пользователя меняют, пока прочитанная пара еще не в кеше.
+        with django_capture_on_commit_callbacks(execute=True):
+            token_cache.invalidate(key)
+        return credentials
+
+    monkeypatch.setattr(
+        TokenAuthentication, 'authenticate_credentials',
+        authenticate_and_change)
+    CachedTokenAuthentication().authenticate_credentials(token.key)
+
+    assert token_cache.get(token.key) is None
+
+
+def test_revoked_token_is_rejected_while_cache_is_warm(
+        token, django_capture_on_commit_callbacks):
+    client = token_client(token)
+    assert client.get('/api/users/me/').status_code == 200
+    assert token_cache.get(token.key) is not None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.delete()
+
+    assert client.get('/api/users/me/').status_code == 401
+
+
+def test_cached_credentials_exclude_password(
+        token, user, django_assert_num_queries):
+    CachedTokenAuthentication().authenticate_credentials(token.key)
+
+    cached = str(cache.get(token_cache._get_cache_key(token.key)))
+    assert user.password not in cached
+    with django_assert_num_queries(0):
+        cached_user, cached_token = token_cache.get(token.key)
+        assert cached_user.username == user.username
+        assert cached_token.user is cached_user
+    # Отложенные поля загружаются из базы при обращении.
+    with django_assert_num_queries(1):
+        assert cached_user.password == user.password
+
+
+def test_process_local_cache_disables_token_cache(token, monkeypatch):
+    monkeypatch.undo()
+    CachedTokenAuthentication().authenticate_credentials(token.key)
+
+    assert token_cache.get(token.key) is None
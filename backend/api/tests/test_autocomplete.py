@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient
+from recipes.reference import ingredient_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def names():
+    for name in ('Соль морская', 'соль', 'Фасоль', 'Сахар', 'ФАСОЛЬ белая'):
+        Ingredient.objects.create(name=name, measurement_unit='г')
+
+
+def search(query):
+    return [ingredient.name for ingredient in ingredient_index.search(query)]
+
+
+def test_prefix_matches_go_before_substring_matches(names):
+    assert search('соль') == ['соль', 'Соль морская', 'Фасоль',
+                              'ФАСОЛЬ белая']
+
+
+def test_search_ignores_case(names):
+    assert search('СОЛЬ') == search('соль')
+    assert search('фас') == ['Фасоль', 'ФАСОЛЬ белая']
+
+
+def test_index_checks_version_once_per_interval(
+        names, settings, django_assert_num_queries):
+    settings.REFERENCE_CACHE_CHECK_INTERVAL_MS = 60 * 1000
+    search('соль')
+
+    cache.set(ingredient_cache.version_key, 'changed', None)
+    with django_assert_num_queries(0):
+        assert search('сах') == ['Сахар']
+
+
+def test_index_is_rebuilt_after_import(
+        names, tmp_path, settings, django_capture_on_commit_callbacks):
+    settings.REFERENCE_CACHE_CHECK_INTERVAL_MS = 60 * 1000
+    assert search('перец') == []
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': 'Перец черный', 'measurement_unit': 'г'},
+    ]), encoding='UTF-8')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('import_ingredients', str(path))
+
+    assert search('перец') == ['Перец черный']
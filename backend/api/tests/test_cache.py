@@ -0,0 +1,56 @@
+import pytest
+from rest_framework import mixins
+
+from api import cache as response_cache
+from recipes.changes import notify_changed
+from recipes.models import Ingredient, Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def test_response_changed_while_rendering_is_not_cached(
+        api_client, recipes, monkeypatch,
+        django_capture_on_commit_callbacks):
+    recipe = recipes[0]
+    retrieve = mixins.RetrieveModelMixin.retrieve
+
+    def retrieve_and_change(self, request, *args, **kwargs):
+        response = retrieve(self, request, *args, **kwargs)
+        # Рецепт меняется, пока ответ со старыми данными еще не записан.
+        with django_capture_on_commit_callbacks(execute=True):
+            response_cache.invalidate(f'recipe:{recipe.id}', 'recipes')
+        return response
+
+    monkeypatch.setattr(
+        mixins.RetrieveModelMixin, 'retrieve', retrieve_and_change)
+    response = api_client.get(f'/api/recipes/{recipe.id}/')
+    assert response['X-Cache'] == 'MISS'
+
+    monkeypatch.setattr(mixins.RetrieveModelMixin, 'retrieve', retrieve)
+    response = api_client.get(f'/api/recipes/{recipe.id}/')
+    assert response['X-Cache'] == 'MISS'
+    response = api_client.get(f'/api/recipes/{recipe.id}/')
+    assert response['X-Cache'] == 'HIT'
+
+
+def test_bulk_changes_invalidate_cached_responses(
+        api_client, recipes, django_capture_on_commit_callbacks):
+    recipe = recipes[0]
+    api_client.get(f'/api/recipes/{recipe.id}/')
+    api_client.get('/api/ingredients/')
+
+    # Изменения в обход сигналов моделей, как в командах загрузки.
+    Recipe.objects.filter(pk=recipe.pk).update(name='Новое название')
+    Ingredient.objects.bulk_create(
+        [Ingredient(name='Новый ингредиент', measurement_unit='г')])
+    with django_capture_on_commit_callbacks(execute=True):
+        notify_changed(Recipe, [recipe.id])
+        notify_changed(Ingredient)
+
+    response = api_client.get(f'/api/recipes/{recipe.id}/')
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['name'] == 'Новое название'
+    response = api_client.get('/api/ingredients/')
+    assert response['X-Cache'] == 'MISS'
+    assert 'Новый ингредиент' in [
+        ingredient['name'] for ingredient in response.data]
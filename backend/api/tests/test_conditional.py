@@ -0,0 +1,104 @@
+from time import time_ns
+
+import pytest
+from django.core.cache import cache
+from django.utils.http import http_date
+
+from api import cache as response_cache
+from api import mixins
+from recipes.models import Favorite
+
+pytestmark = pytest.mark.django_db
+
+TAGS = ('recipes', 'tags', 'ingredients', 'authors')
+
+
+def set_versions(version, tags=TAGS):
+    cache.set_many(
+        {f'{response_cache.TAG_KEY_PREFIX}:{tag}': version for tag in tags},
+        None
+    )
+
+
+def test_matching_etag_returns_not_modified(api_client, recipes):
+    response = api_client.get('/api/recipes/')
+    etag = response['ETag']
+
+    response = api_client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+def test_etag_is_compared_before_modification_date(api_client, recipes):
+    response = api_client.get(
+        '/api/recipes/',
+        HTTP_IF_NONE_MATCH='"other"',
+        HTTP_IF_MODIFIED_SINCE=http_date(time_ns() // 10 ** 9 + 3600)
+    )
+
+    assert response.status_code == 200
+
+
+def test_modification_date_returns_not_modified(api_client, recipes):
+    set_versions(time_ns() - 10 * 10 ** 9)
+    last_modified = api_client.get('/api/recipes/')['Last-Modified']
+
+    response = api_client.get(
+        '/api/recipes/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    assert response.status_code == 304
+
+
+def test_change_within_the_same_second_is_not_hidden(
+        api_client, recipes, monkeypatch):
+    version = 1700000000 * 10 ** 9 + 500 * 10 ** 6
+    set_versions(version)
+    # Версия в текущей секунде: дата изменения не отдается, иначе
+    # следующее изменение в ту же секунду дало бы ложный 304.
+    monkeypatch.setattr(mixins, 'time_ns', lambda: version + 10 ** 8)
+    response = api_client.get(
+        '/api/recipes/', HTTP_IF_MODIFIED_SINCE=http_date(1700000000))
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response
+
+    monkeypatch.setattr(mixins, 'time_ns', lambda: version + 10 ** 9)
+    last_modified = api_client.get('/api/recipes/')['Last-Modified']
+    assert last_modified == http_date(1700000001)
+    response = api_client.get(
+        '/api/recipes/', HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+
+def test_write_changes_etag(
+        user_client, user, recipes, django_capture_on_commit_callbacks):
+    etag = user_client.get('/api/recipes/')['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.filter(user=user).delete()
+    response = user_client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_user_specific_responses_vary_by_authorization(user_client, recipes):
+    response = user_client.get(f'/api/recipes/{recipes[0].id}/')
+
+    assert 'Authorization' in response['Vary']
+
+
+def test_only_shown_author_fields_invalidate_recipe_lists(
+        authors, recipes, django_capture_on_commit_callbacks):
+    set_versions(1, ('authors',))
+    author = authors[0]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.set_password('new password')
+        author.save()
+    assert response_cache.get_tag_versions(['authors']) == {'authors': 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Другое имя'
+        author.save()
+    assert response_cache.get_tag_versions(['authors']) != {'authors': 1}
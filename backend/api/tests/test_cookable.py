@@ -0,0 +1,87 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.cookable import CookableIndex, cookable_index
+from recipes.models import IngredientInRecipe
+
+pytestmark = pytest.mark.django_db
+
+
+def cookable(client, ingredients, **params):
+    response = client.get('/api/recipes/cookable/', {
+        'ingredients': [ingredient.id for ingredient in ingredients],
+        'limit': 100,
+        **params,
+    })
+    assert response.status_code == 200
+    return [(recipe['id'], recipe['coverage'])
+            for recipe in response.data['results']]
+
+
+def test_recipes_are_ordered_by_coverage(api_client, recipes, ingredients):
+    # У рецепта номер n ингредиенты ingredients[n:n + 3].
+    assert cookable(api_client, ingredients[:3]) == [
+        (recipes[0].id, pytest.approx(1)),
+        (recipes[1].id, pytest.approx(2 / 3)),
+        (recipes[2].id, pytest.approx(1 / 3)),
+    ]
+    assert [recipe_id for recipe_id, _ in cookable(
+        api_client, ingredients[:3], min_coverage=0.5)] == [
+        recipes[0].id, recipes[1].id]
+
+
+def test_equal_coverage_is_ordered_from_new_to_old(
+        api_client, recipes, ingredients):
+    assert [recipe_id for recipe_id, _ in cookable(
+        api_client, ingredients[5:6])] == [
+        recipes[5].id, recipes[4].id, recipes[3].id]
+
+
+def test_ingredients_are_required(api_client, recipes):
+    response = api_client.get('/api/recipes/cookable/')
+
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def changed_recipe(recipes, ingredients, settings,
+                   django_capture_on_commit_callbacks):
+    """Прогревает индекс и меняет состав первого рецепта."""
+    settings.IMAGE_WORKERS = 0
+    cookable_index.search([ingredients[0].id])
+    recipe = recipes[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=ingredients[29], amount=1)
+        recipe.save()
+    return recipe
+
+
+def test_index_catches_up_from_change_log(
+        changed_recipe, ingredients, monkeypatch):
+    def load(*args):
+        raise AssertionError('Индекс перестроен целиком.')
+
+    monkeypatch.setattr(CookableIndex, '_load', load)
+
+    assert cookable_index.search([ingredients[0].id]) == []
+    assert cookable_index.search([ingredients[29].id])[0] == (
+        changed_recipe.id, 1)
+
+
+def test_index_is_rebuilt_when_change_log_is_evicted(
+        changed_recipe, ingredients, monkeypatch):
+    cache.delete(CookableIndex.CHANGE_KEY.format(
+        cache.get(CookableIndex.SEQUENCE_KEY)))
+    load = CookableIndex._load
+    loads = []
+
+    def count_load(self, *args):
+        loads.append(args)
+        return load(self, *args)
+
+    monkeypatch.setattr(CookableIndex, '_load', count_load)
+
+    assert cookable_index.search([ingredients[0].id]) == []
+    assert len(loads) == 1
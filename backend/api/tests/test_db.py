@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def synchronous_images(settings):
+    # В тестах с настоящими фиксациями фоновый поток картинок обращался
+    # бы к базе одновременно с ее очисткой после теста.
+    settings.IMAGE_WORKERS = 0
+
+
+@pytest.fixture
+def health_checks(monkeypatch):
+    checks = []
+    is_usable = connection.is_usable
+
+    def counted_is_usable():
+        checks.append(True)
+        return is_usable()
+
+    monkeypatch.setattr(connection, 'is_usable', counted_is_usable)
+    return checks
+
+
+def test_cached_response_does_not_check_connection(
+        api_client, tags, health_checks, django_assert_num_queries):
+    api_client.get('/api/tags/')
+    health_checks.clear()
+
+    with django_assert_num_queries(0):
+        response = api_client.get('/api/tags/')
+
+    assert response['X-Cache'] == 'HIT'
+    assert health_checks == []
+
+
+# Внутри транзакции теста соединение не проверяется.
+@pytest.mark.django_db(transaction=True)
+def test_connection_is_checked_once_per_request(
+        user_client, recipes, health_checks):
+    response = user_client.get('/api/recipes/')
+
+    assert response.status_code == 200
+    assert len(health_checks) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dead_connection_is_replaced_before_first_query(
+        user_client, recipes, monkeypatch):
+    events = []
+    close = connection.close
+
+    def record_close():
+        events.append('close')
+        close()
+
+    def record_query(execute, sql, params, many, context):
+        events.append('query')
+        return execute(sql, params, many, context)
+
+    connection.ensure_connection()
+    # Сервер закрыл постоянное соединение между запросами.
+    monkeypatch.setattr(connection, 'is_usable', lambda: False)
+    monkeypatch.setattr(connection, 'close', record_close)
+    with connection.execute_wrapper(record_query):
+        response = user_client.get('/api/recipes/')
+
+    assert response.status_code == 200
+    assert events[0] == 'close'
+    assert events.count('close') == 1
+    assert 'query' in events
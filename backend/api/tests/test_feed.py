@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+from api.tests.conftest import create_recipe, create_user
+from recipes import feed
+from recipes.models import FeedEntry
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+def test_feed_backfilled_when_author_stops_being_popular(
+        settings, authors, tags, ingredients,
+        django_capture_on_commit_callbacks):
+    settings.FEED_FANOUT_LIMIT = 2
+    author = create_user('popular')
+    with django_capture_on_commit_callbacks(execute=True):
+        for follower in authors[:3]:
+            Subscription.objects.create(user=follower, author=author)
+        # У автора больше FEED_FANOUT_LIMIT подписчиков: рецепт
+        # не раскладывается по лентам и подмешивается при чтении.
+        recipe = create_recipe(author, tags[:1], ingredients[:3])
+    assert not FeedEntry.objects.filter(recipe=recipe).exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Subscription.objects.filter(user=authors[0], author=author).delete()
+
+    assert set(FeedEntry.objects.filter(recipe=recipe).values_list(
+        'user', flat=True)) == {authors[1].id, authors[2].id}
+
+
+def test_feed_backfilled_when_bulk_unsubscribe_skips_limit(
+        settings, authors, tags, ingredients,
+        django_capture_on_commit_callbacks):
+    settings.FEED_FANOUT_LIMIT = 2
+    author = create_user('popular')
+    with django_capture_on_commit_callbacks(execute=True):
+        for follower in authors[:3]:
+            Subscription.objects.create(user=follower, author=author)
+        recipe = create_recipe(author, tags[:1], ingredients[:3])
+    assert not FeedEntry.objects.filter(recipe=recipe).exists()
+
+    # Одним удалением подписчиков становится меньше порога: счетчик
+    # проходит мимо FEED_FANOUT_LIMIT, не останавливаясь на нем.
+    with django_capture_on_commit_callbacks(execute=True):
+        Subscription.objects.filter(
+            user__in=authors[:3], author=author).exclude(
+            user=authors[2]).delete()
+
+    assert list(FeedEntry.objects.filter(recipe=recipe).values_list(
+        'user', flat=True)) == [authors[2].id]
+
+
+def test_unsubscribe_from_regular_author_skips_backfill(
+        settings, authors, tags, ingredients, monkeypatch,
+        django_capture_on_commit_callbacks):
+    settings.FEED_FANOUT_LIMIT = 2
+    author = create_user('regular')
+    with django_capture_on_commit_callbacks(execute=True):
+        for follower in authors[:2]:
+            Subscription.objects.create(user=follower, author=author)
+        create_recipe(author, tags[:1], ingredients[:3])
+    backfilled = []
+    monkeypatch.setattr(feed, 'backfill', backfilled.append)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Subscription.objects.filter(user=authors[0], author=author).delete()
+
+    assert backfilled == []
+
+
+def test_fan_out_runs_in_background(
+        settings, user, tags, ingredients, monkeypatch,
+        django_capture_on_commit_callbacks):
+    settings.FEED_WORKERS = 1
+    tasks = []
+    monkeypatch.setattr(
+        feed, '_executor',
+        SimpleNamespace(submit=lambda *args: tasks.append(args)))
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = create_recipe(user, tags[:1], ingredients[:3])
+
+    assert tasks == [(feed._run_in_worker, feed.fan_out, recipe.id)]
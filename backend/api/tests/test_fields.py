@@ -0,0 +1,129 @@
+import base64
+import io
+import os
+import textwrap
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from PIL import Image
+from rest_framework.serializers import ValidationError
+
+from api import fields
+from api.fields import (
+    BASE64_CHUNK_SIZE,
+    SPOOL_MAX_SIZE,
+    StreamingBase64ImageField
+)
+
+CONCURRENT_UPLOADS = 4
+
+
+def encode_image(size):
+    """PNG из шума: он почти не сжимается, и размер файла близок
+    к трем байтам на пиксель."""
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_wrapped_base64_image():
+    content = encode_image((200, 200))
+    encoded = base64.b64encode(content).decode()
+    assert len(encoded) > BASE64_CHUNK_SIZE
+    # Строки по 76 символов, как у base64 -w 76: куски строки
+    # не выравниваются по 4 символам base64.
+    data = 'data:image/png;base64,' + '\n'.join(textwrap.wrap(encoded, 76))
+
+    file = StreamingBase64ImageField().to_internal_value(data)
+
+    assert file.name.endswith('.png')
+    assert file.read() == content
+
+
+@pytest.fixture
+def temporary_files(monkeypatch):
+    """Временные файлы, созданные полем картинки."""
+    files = []
+
+    class RecordedFile(SpooledTemporaryFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            files.append(self)
+
+    monkeypatch.setattr(fields, 'SpooledTemporaryFile', RecordedFile)
+    return files
+
+
+@pytest.mark.parametrize('data', (
+    'data:image/png;base64,не base64',
+    base64.b64encode(b'not an image').decode(),
+    base64.b64encode(encode_image((10, 10))[:50]).decode(),
+), ids=('invalid base64', 'not an image', 'truncated image'))
+def test_rejected_image_file_is_closed(temporary_files, data):
+    with pytest.raises(ValidationError):
+        StreamingBase64ImageField().to_internal_value(data)
+
+    assert len(temporary_files) == 1
+    assert temporary_files[0].closed
+
+
+@pytest.mark.django_db
+def test_image_file_is_closed_after_recipe_is_saved(
+        temporary_files, user_client, tags, ingredients):
+    response = user_client.post('/api/recipes/', {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+        'image': 'data:image/png;base64,' + base64.b64encode(
+            encode_image((10, 10))).decode(),
+    }, format='json')
+
+    assert response.status_code == 201
+    assert len(temporary_files) == 1
+    assert temporary_files[0].closed
+
+
+def test_base64_image_is_decoded_in_bounded_memory():
+    content = encode_image((1500, 1500))
+    data = 'data:image/png;base64,' + base64.b64encode(content).decode()
+
+    tracemalloc.start()
+    try:
+        file = StreamingBase64ImageField().to_internal_value(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert file.size == len(content)
+    # Строка base64 уже в памяти; декодирование добавляет к ней
+    # куски и буфер временного файла до его выгрузки на диск,
+    # а не копию картинки.
+    assert peak < len(data) / 4
+
+
+def test_concurrent_uploads_are_decoded_in_bounded_memory():
+    content = encode_image((1000, 1000))
+    data = 'data:image/png;base64,' + base64.b64encode(content).decode()
+    field = StreamingBase64ImageField()
+
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(CONCURRENT_UPLOADS) as executor:
+            files = list(executor.map(
+                field.to_internal_value, [data] * CONCURRENT_UPLOADS))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    for file in files:
+        file.close()
+    assert [file.size for file in files] == [len(content)] * len(files)
+    # Каждая загрузка держит в памяти буфер временного файла до его
+    # выгрузки на диск и несколько кусков, а не копию картинки.
+    assert peak < CONCURRENT_UPLOADS * (SPOOL_MAX_SIZE + 4 * BASE64_CHUNK_SIZE)
+    assert SPOOL_MAX_SIZE + 4 * BASE64_CHUNK_SIZE < len(content) / 2
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from api.tests.conftest import create_recipe
+from recipes import images
+from recipes.images import VARIANTS, process_recipe_image
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def save_image(name):
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), '#E26C2D').save(buffer, 'JPEG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def get_paths(variants):
+    return [path for variant in VARIANTS
+            for path in variants[variant].values()]
+
+
+@pytest.fixture
+def recipe(user, tags, ingredients):
+    recipe = create_recipe(user, tags[:1], ingredients[:3])
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image=save_image('recipes/images/first.jpg'))
+    return recipe
+
+
+def test_image_change_deletes_old_variants(recipe):
+    process_recipe_image(recipe.id)
+    old_paths = get_paths(Recipe.objects.get(pk=recipe.pk).image_variants)
+    assert all(default_storage.exists(path) for path in old_paths)
+
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image=save_image('recipes/images/second.jpg'))
+    process_recipe_image(recipe.id)
+
+    recipe = Recipe.objects.get(pk=recipe.pk)
+    assert recipe.has_image_variants()
+    assert all(default_storage.exists(path)
+               for path in get_paths(recipe.image_variants))
+    assert not any(default_storage.exists(path) for path in old_paths)
+
+
+def test_variants_of_replaced_image_are_discarded(recipe, monkeypatch):
+    build_variants = images.build_variants
+    built = []
+
+    def build_and_replace(image_name):
+        variants = build_variants(image_name)
+        built.extend(get_paths(variants))
+        # Картинку заменяют, пока строятся варианты старой.
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=save_image('recipes/images/second.jpg'))
+        return variants
+
+    monkeypatch.setattr(images, 'build_variants', build_and_replace)
+    process_recipe_image(recipe.id)
+
+    assert Recipe.objects.get(pk=recipe.pk).image_variants == {}
+    assert built
+    assert not any(default_storage.exists(path) for path in built)
@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Индексы по выражениям и планы запросов - только PostgreSQL.'
+    ),
+]
+
+PAGE_SIZE = 6
+
+QUERIES = {
+    'recipe_pub_date_id_idx': lambda user, author: Recipe.objects.order_by(
+        '-pub_date', '-id')[:PAGE_SIZE],
+    'recipe_author_pub_date_idx': lambda user, author: Recipe.objects.filter(
+        author=author).order_by('-pub_date')[:PAGE_SIZE],
+    'unique_favorite': lambda user, author: Recipe.objects.filter(
+        favorites__user=user),
+    'unique_shopping_list': lambda user, author: Recipe.objects.filter(
+        shopping_list__user=user),
+    'ingredient_upper_name_idx': lambda user, author: (
+        Ingredient.objects.filter(name__istartswith='ингр')),
+    'unique_following': lambda user, author: User.objects.filter(
+        following__user=user),
+}
+
+
+@pytest.fixture
+def explain():
+    # На тестовом наборе таблицы малы, и планировщик предпочел бы
+    # последовательное чтение; без него план показывает, подходит ли
+    # запросу индекс.
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    return lambda queryset: queryset.explain()
+
+
+@pytest.mark.parametrize('index', QUERIES)
+def test_query_uses_index(index, user, authors, recipes, explain):
+    plan = explain(QUERIES[index](user, authors[0]))
+    assert index in plan, plan
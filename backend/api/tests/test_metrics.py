@@ -0,0 +1,78 @@
+import re
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.conftest import create_user
+
+pytestmark = pytest.mark.django_db
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[^}]*\})? [0-9.e+-]+$')
+
+
+@pytest.fixture
+def staff():
+    staff = create_user('staff')
+    staff.is_staff = True
+    staff.save()
+    return staff
+
+
+@pytest.fixture
+def staff_client(staff):
+    client = APIClient()
+    client.force_authenticate(staff)
+    return client
+
+
+def test_metrics_are_for_staff_only(api_client, user_client):
+    assert api_client.get('/api/_metrics').status_code == 401
+    assert user_client.get('/api/_metrics').status_code == 403
+
+
+def test_metrics_use_prometheus_text_format(staff_client, api_client, tags):
+    api_client.get('/api/tags/')
+
+    response = staff_client.get('/api/_metrics')
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    lines = response.content.decode().splitlines()
+    assert '# TYPE foodgram_request_duration_seconds histogram' in lines
+    samples = [line for line in lines if not line.startswith('#')]
+    assert all(SAMPLE.match(line) for line in samples), samples
+    tag_list = [line for line in samples if 'view="api:tags-list"' in line
+                and line.startswith('foodgram_request_duration_seconds')]
+    counts = [float(line.rsplit(' ', 1)[1]) for line in tag_list
+              if '_bucket' in line]
+    # Корзины гистограммы накопительные, последняя (+Inf) равна _count.
+    assert counts == sorted(counts)
+    assert any(line.startswith(
+        'foodgram_request_duration_seconds_count'
+    ) and line.endswith(f' {int(counts[-1])}') for line in tag_list)
+
+
+def test_response_has_server_timing(api_client, tags):
+    response = api_client.get('/api/tags/')
+
+    timing = response['Server-Timing']
+    assert re.fullmatch(
+        r'db;dur=[0-9.]+;desc="\d+ queries", serialize;dur=[0-9.]+, '
+        r'total;dur=[0-9.]+',
+        timing
+    )
+
+
+def test_profile_is_returned_to_staff_only(staff, user, tags):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+    response = client.get('/api/tags/', {'_profile': 1})
+    assert response['Content-Type'] == 'application/json'
+
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=staff).key}')
+    response = client.get('/api/tags/', {'_profile': 1})
+    assert response['Content-Type'].startswith('text/plain')
+    assert 'cumulative' in response.content.decode()
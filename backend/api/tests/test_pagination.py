@@ -0,0 +1,71 @@
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def walk(client, path, params):
+    """Листает курсорные страницы вперед, возвращает страницы id."""
+    pages = []
+    response = client.get(path, params)
+    while True:
+        assert response.status_code == 200
+        pages.append([item['id'] for item in response.data['results']])
+        if response.data['next'] is None:
+            return pages, response
+        response = client.get(response.data['next'])
+
+
+def test_recipe_list_uses_page_numbers_by_default(api_client, recipes):
+    response = api_client.get('/api/recipes/', {'limit': 5})
+
+    assert response.data['count'] == len(recipes)
+    assert 'previous' in response.data
+    assert 'page=2' in response.data['next']
+
+
+def test_recipe_cursor_pages_are_stable_on_ties(api_client, recipes):
+    # Одинаковая дата у всех рецептов: порядок задает id.
+    Recipe.objects.update(pub_date=timezone.now())
+
+    pages, _ = walk(
+        api_client, '/api/recipes/', {'pagination': 'cursor', 'limit': 5})
+
+    ids = [recipe_id for page in pages for recipe_id in page]
+    assert ids == sorted((recipe.id for recipe in recipes), reverse=True)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 4]
+
+
+def test_recipe_previous_cursor_returns_previous_page(api_client, recipes):
+    first = api_client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'limit': 5})
+    assert first.data['previous'] is None
+    assert 'count' not in first.data
+
+    second = api_client.get(first.data['next'])
+    previous = api_client.get(second.data['previous'])
+
+    assert previous.data['results'] == first.data['results']
+
+
+def test_recipe_cursor_approximate_count(api_client, recipes):
+    response = api_client.get(
+        '/api/recipes/',
+        {'pagination': 'cursor', 'count': 'approximate', 'limit': 5}
+    )
+
+    # Оценка PostgreSQL может отличаться от точного числа.
+    assert isinstance(response.data['count'], int)
+    assert len(response.data['results']) == 5
+
+
+def test_subscription_cursor_pages(user_client, authors, recipes):
+    pages, _ = walk(
+        user_client, '/api/users/subscriptions/',
+        {'pagination': 'cursor', 'limit': 5}
+    )
+
+    ids = [author_id for page in pages for author_id in page]
+    assert ids == sorted(author.id for author in authors)
@@ -0,0 +1,85 @@
+import pytest
+
+from api.serializers import CreateRecipeSerializer
+from api.tests.conftest import create_recipe
+from recipes.models import Favorite, Recipe
+from recipes.reference import ingredient_cache, tag_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('limit', (2, 6, 12))
+def test_recipe_list_query_count_does_not_depend_on_page_size(
+        user_client, recipes, limit, django_assert_num_queries):
+    # COUNT(*) для пагинации, рецепты с аннотациями и две предвыборки:
+    # теги и ингредиенты.
+    with django_assert_num_queries(4):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    assert all(recipe['tags'] and recipe['ingredients']
+               for recipe in results)
+    assert any(recipe['is_favorited'] for recipe in results)
+    assert all(recipe['author']['is_subscribed'] for recipe in results)
+
+
+def test_recipe_update_changing_one_ingredient_query_count(
+        user, user_client, tags, ingredients, django_assert_num_queries):
+    recipe = create_recipe(user, tags[:2], ingredients[:20])
+    data = {
+        'tags': [tag.id for tag in tags[:2]],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 100}
+            for ingredient in ingredients[:20]
+        ],
+    }
+    data['ingredients'][0]['amount'] = 250
+    # Справочники загружаются в память воркера один раз, не на запрос.
+    tag_cache.all()
+    ingredient_cache.all()
+
+    # Рецепт и две предвыборки, текущие теги, один UPDATE количеств,
+    # владельцы списков покупок с рецептом, UPDATE рецепта, две точки
+    # сохранения с освобождением и две предвыборки для ответа. Число
+    # не зависит от количества ингредиентов.
+    with django_assert_num_queries(13):
+        response = user_client.patch(
+            f'/api/recipes/{recipe.id}/', data, format='json')
+
+    assert response.status_code == 200
+    amounts = {ingredient['id']: ingredient['amount']
+               for ingredient in response.json()['ingredients']}
+    assert len(amounts) == 20
+    assert amounts[ingredients[0].id] == 250
+    assert recipe.recipe_ingredient.get(
+        ingredient=ingredients[0]).amount == 250
+
+
+def test_recipe_update_keeps_counters_changed_during_request(
+        user, user_client, authors, tags, ingredients, monkeypatch):
+    recipe = create_recipe(user, tags[:1], ingredients[:3])
+    update = CreateRecipeSerializer.update
+
+    def update_after_favorite(self, instance, validated_data):
+        # Рецепт уже загружен, когда другой пользователь добавляет его
+        # в избранное, а фоновая задача сохраняет копии картинки.
+        Favorite.objects.create(user=authors[0], recipe=recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_variants={'source': recipe.image.name})
+        return update(self, instance, validated_data)
+
+    monkeypatch.setattr(
+        CreateRecipeSerializer, 'update', update_after_favorite)
+    response = user_client.patch(f'/api/recipes/{recipe.id}/', {
+        'name': 'Новое название',
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 100}],
+    }, format='json')
+
+    assert response.status_code == 200
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.favorites_count == 1
+    assert recipe.image_variants == {'source': recipe.image.name}
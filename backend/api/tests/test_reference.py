@@ -0,0 +1,25 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.models import Tag
+from recipes.reference import tag_cache
+
+pytestmark = pytest.mark.django_db
+
+
+def test_tag_cache_checks_version_once_per_interval(
+        settings, tags, django_capture_on_commit_callbacks,
+        django_assert_num_queries):
+    settings.REFERENCE_CACHE_CHECK_INTERVAL_MS = 60 * 1000
+    assert tag_cache.all() == tags
+
+    # Другой воркер сменил версию: до конца интервала этот воркер
+    # не сверяет ее и не перечитывает справочник.
+    cache.set(tag_cache.version_key, 'changed', None)
+    with django_assert_num_queries(0):
+        assert tag_cache.all() == tags
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tag = Tag.objects.create(name='Перекус', color='#000000', slug='snack')
+    # Изменивший справочник воркер перечитывает его сразу.
+    assert tag_cache.all() == [*tags, tag]
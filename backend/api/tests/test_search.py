@@ -0,0 +1,75 @@
+import pytest
+
+from api.tests.conftest import create_recipe
+from recipes import search
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def dill_recipes(authors, tags, ingredients):
+    """Рецепты, где «укроп» в названии, в описании и в ингредиентах."""
+    dill = Ingredient.objects.create(name='Укроп', measurement_unit='г')
+    in_ingredients = create_recipe(
+        authors[0], tags[:1], [dill], name='Салат')
+    in_text = create_recipe(
+        authors[1], tags[:1], ingredients[:1], name='Суп')
+    in_text.text = 'Посыпать укропом.'
+    in_text.save()
+    in_name = create_recipe(
+        authors[2], tags[:1], ingredients[:1], name='Картофель с укропом')
+    create_recipe(authors[3], tags[:1], ingredients[:1], name='Каша')
+    return in_name, in_text, in_ingredients
+
+
+def found(client, query):
+    response = client.get('/api/recipes/', {'search': query})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+def test_name_ranks_above_text_and_ingredients(api_client, dill_recipes):
+    assert found(api_client, 'укроп') == [
+        recipe.id for recipe in dill_recipes]
+
+
+def test_all_query_words_must_match(api_client, dill_recipes):
+    in_name, _, _ = dill_recipes
+
+    assert found(api_client, 'картофель укроп') == [in_name.id]
+    assert found(api_client, 'картофель свекла') == []
+
+
+# Индекс сбрасывается из обработчика on_commit, поэтому нужны
+# настоящие фиксации транзакций.
+@pytest.mark.django_db(transaction=True)
+def test_index_follows_changed_recipes(api_client, dill_recipes, settings):
+    settings.IMAGE_WORKERS = 0
+    in_name, _, _ = dill_recipes
+    assert found(api_client, 'пюре') == []
+
+    in_name.name = 'Пюре'
+    in_name.save()
+
+    assert found(api_client, 'пюре') == [in_name.id]
+
+
+@pytest.mark.parametrize('word, stem', (
+    ('укропом', 'укроп'),
+    ('Курицей', 'куриц'),
+    ('сыр', 'сыр'),
+))
+def test_fallback_stemming(word, stem):
+    assert search.tokenize(word) == [stem]
+
+
+def test_fallback_index_ranks_by_weighted_sections(dill_recipes):
+    in_name, in_text, in_ingredients = dill_recipes
+    search.recipe_index.invalidate()
+
+    assert search.recipe_index.search('укроп') == {
+        in_name.id: search.WEIGHTS['A'],
+        in_text.id: search.WEIGHTS['B'],
+        in_ingredients.id: search.WEIGHTS['C'],
+    }
@@ -0,0 +1,67 @@
+import pytest
+
+from recipes.models import ShoppingList, ShoppingListIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+def get_amounts(user):
+    return dict(ShoppingListIngredient.objects.filter(
+        user=user, amount__gt=0).values_list('ingredient_id', 'amount'))
+
+
+def test_shopping_cart_aggregate_follows_cart(user, user_client, recipes):
+    ShoppingList.objects.filter(user=user).delete()
+    first, second = recipes[0], recipes[1]
+    user_client.post(f'/api/recipes/{first.id}/shopping_cart/')
+    user_client.post(f'/api/recipes/{second.id}/shopping_cart/')
+    # Рецепты 0 и 1 делят два ингредиента из трех.
+    shared = first.ingredients.filter(pk__in=second.ingredients.all())
+    assert {get_amounts(user)[ingredient.id] for ingredient in shared} == {
+        200}
+
+    user_client.delete(f'/api/recipes/{first.id}/shopping_cart/')
+    user_client.delete(f'/api/recipes/{second.id}/shopping_cart/')
+    assert get_amounts(user) == {}
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/', {'format': 'json'})
+    # Обнулившиеся строки агрегата не попадают в выгрузку.
+    assert b''.join(response.streaming_content) == b'[]'
+
+
+def test_failed_aggregate_update_rolls_back_cart_row(
+        user, user_client, recipes, monkeypatch):
+    recipe = recipes[1]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError
+
+    monkeypatch.setattr('recipes.shopping_list.apply_delta', fail)
+    with pytest.raises(RuntimeError):
+        user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    assert not ShoppingList.objects.filter(user=user, recipe=recipe).exists()
+
+
+def download(client):
+    return client.get(
+        '/api/recipes/download_shopping_cart/', {'format': 'json'})
+
+
+def test_asgi_download_matches_wsgi_download(user_client, recipes, settings):
+    wsgi = b''.join(download(user_client).streaming_content)
+
+    settings.SERVER_INTERFACE = 'asgi'
+    response = download(user_client)
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == wsgi
+
+
+def test_asgi_download_is_capped(user, user_client, recipes, settings):
+    settings.SERVER_INTERFACE = 'asgi'
+    settings.SHOPPING_CART_ASGI_MAX_ROWS = len(get_amounts(user)) - 1
+
+    response = download(user_client)
+
+    assert response.status_code == 413
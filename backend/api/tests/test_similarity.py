@@ -0,0 +1,92 @@
+import pytest
+from django.db.models import F
+
+from api.tests.conftest import create_recipe, create_user
+from recipes import similarity
+from recipes.models import Favorite, ShoppingList, SimilarRecipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def added(authors, tags, ingredients):
+    """Четыре рецепта и их добавления: первый и второй всегда вместе,
+    третий один раз вместе с ними, четвертый ни с чем."""
+    first, second, third, fourth = (
+        create_recipe(authors[0], tags[:1], ingredients[:3],
+                      name=f'Рецепт {number}')
+        for number in range(4)
+    )
+    readers = [create_user(f'reader{number}') for number in range(4)]
+    Favorite.objects.create(user=readers[0], recipe=first)
+    Favorite.objects.create(user=readers[0], recipe=second)
+    Favorite.objects.create(user=readers[1], recipe=first)
+    # Рецепт в избранном и в списке покупок считается один раз.
+    Favorite.objects.create(user=readers[1], recipe=second)
+    ShoppingList.objects.create(user=readers[1], recipe=second)
+    ShoppingList.objects.create(user=readers[1], recipe=third)
+    ShoppingList.objects.create(user=readers[2], recipe=third)
+    Favorite.objects.create(user=readers[3], recipe=fourth)
+    return readers, (first, second, third, fourth)
+
+
+def similar_to(recipe):
+    return list(SimilarRecipe.objects.filter(
+        recipe=recipe).values_list('similar_id', 'score'))
+
+
+@pytest.mark.parametrize('chunk_size', (1, similarity.CHUNK_SIZE))
+def test_similar_recipes_are_ranked_by_cosine(added, chunk_size):
+    _, (first, second, third, fourth) = added
+
+    assert similarity.build(chunk_size=chunk_size) == (4, 6)
+
+    assert similar_to(first) == [
+        (second.id, pytest.approx(1.0)),
+        (third.id, pytest.approx(0.5)),
+    ]
+    assert sorted(similar_to(third)) == [
+        (first.id, pytest.approx(0.5)),
+        (second.id, pytest.approx(0.5)),
+    ]
+    assert similar_to(fourth) == []
+
+
+def test_recipe_is_not_similar_to_itself(added):
+    similarity.build()
+
+    assert not SimilarRecipe.objects.filter(
+        recipe_id=F('similar_id')).exists()
+
+
+def test_build_keeps_top_recipes_only(added):
+    _, (first, second, _, _) = added
+
+    similarity.build(top=1)
+
+    assert similar_to(first) == [(second.id, pytest.approx(1.0))]
+
+
+def test_rebuild_follows_changed_additions(added):
+    readers, (first, second, third, _) = added
+    similarity.build()
+
+    # Первый и второй рецепты теперь вместе только у одного читателя.
+    Favorite.objects.filter(user=readers[0], recipe=second).delete()
+    ShoppingList.objects.filter(recipe=third).delete()
+    similarity.build()
+
+    assert similar_to(first) == [(second.id, pytest.approx(1 / 2 ** 0.5))]
+    # Рецепт, который больше никто не добавляет, теряет похожие.
+    assert similar_to(third) == []
+
+
+def test_similar_endpoint_keeps_ranking(added, api_client):
+    _, (first, second, third, _) = added
+    similarity.build()
+
+    response = api_client.get(f'/api/recipes/{first.id}/similar/')
+
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data] == [
+        second.id, third.id]
@@ -0,0 +1,23 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('limit', (1, 6))
+def test_subscriptions_query_count_does_not_depend_on_page_size(
+        user_client, recipes, limit, django_assert_num_queries):
+    # COUNT(*) для пагинации, подписки с авторами и счетчиками
+    # и рецепты всех авторов страницы одним оконным запросом.
+    with django_assert_num_queries(3):
+        response = user_client.get(
+            '/api/users/subscriptions/',
+            {'limit': limit, 'recipes_limit': 1}
+        )
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    for author in results:
+        assert author['is_subscribed']
+        assert author['recipes_count'] == 2
+        assert len(author['recipes']) == 1
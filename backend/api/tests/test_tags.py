@@ -0,0 +1,61 @@
+import pytest
+from django.core.exceptions import ValidationError
+
+from recipes.models import MAX_TAG_BIT, Recipe, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+def filtered_ids(client, slugs):
+    response = client.get(
+        '/api/recipes/', [('limit', 100)] + [('tags', slug) for slug in slugs])
+    assert response.status_code == 200
+    return {recipe['id'] for recipe in response.data['results']}
+
+
+def test_new_tags_take_free_bits(tags):
+    assert [tag.bit for tag in tags] == [0, 1, 2]
+
+    tags[1].delete()
+    tag = Tag.objects.create(name='Перекус', color='#000000', slug='snack')
+
+    assert tag.bit == 1
+
+
+def test_tag_limit_is_validated(tags):
+    for bit in range(len(tags), MAX_TAG_BIT + 1):
+        Tag.objects.create(name=f'Тег {bit}', color=f'#{bit:06}',
+                           slug=f'tag{bit}')
+
+    with pytest.raises(ValidationError):
+        Tag(name='Лишний', color='#FFFFFF', slug='extra').full_clean()
+
+
+@pytest.mark.parametrize('slugs, remainders', (
+    (['breakfast'], {0, 1, 2}),
+    (['dinner'], {2}),
+    (['lunch', 'dinner'], {1, 2}),
+))
+def test_recipes_match_any_of_several_tags(api_client, recipes, slugs,
+                                           remainders):
+    # У рецепта номер n теги tags[:n % 3 + 1].
+    assert filtered_ids(api_client, slugs) == {
+        recipe.id for number, recipe in enumerate(recipes)
+        if number % 3 in remainders
+    }
+
+
+def test_mask_follows_changed_tags(api_client, recipes, tags):
+    recipe = recipes[0]
+    recipe.tags.set([tags[2]])
+
+    assert recipe.id in filtered_ids(api_client, ['dinner'])
+    assert recipe.id not in filtered_ids(api_client, ['breakfast'])
+
+
+def test_deleted_tag_bit_is_cleared_before_reuse(api_client, recipes, tags):
+    tags[2].delete()
+    Tag.objects.create(name='Перекус', color='#000000', slug='snack')
+
+    assert filtered_ids(api_client, ['snack']) == set()
+    assert not Recipe.objects.filter(tags_mask__gte=1 << 2).exists()
@@ -1,16 +1,17 @@
 from django.urls import include, path
-from rest_framework.routers import DefaultRouter
 
+from api.routers import AsyncReadRouter
 from api.views import (
     CustomUserViewSet,
     IngredientViewSet,
+    MetricsView,
     RecipeViewSet,
     TagViewSet
 )
 
 app_name = 'api'
 
-router_v1 = DefaultRouter()
+router_v1 = AsyncReadRouter()
 
 router_v1.register(
     r'users',
@@ -34,6 +35,7 @@ router_v1.register(
 )
 
 urlpatterns = [
+    path('_metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
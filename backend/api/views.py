@@ -1,23 +1,57 @@
-from django.db.models import Sum
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.filters import SearchFilter
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from api import metrics
 from api.filters import (
     IngredientFilter,
     RecipeFilter
 )
-from api.mixins import CustomViewSetMixin
-from api.pagination import CustomPaginator
+from api.mixins import (
+    AnonymousCacheMixin,
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    CustomViewSetMixin
+)
+from api.pagination import (
+    CustomCursorPaginator,
+    CustomPaginator,
+    FeedCursorPaginator,
+    SubscriptionCursorPaginator
+)
 from api.permissions import IsAuthorOrAdminOrReadOnly
+from api.renderers import (
+    PrometheusRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer
+)
 from api.serializers import (
+    CookableQuerySerializer,
+    CookableRecipeSerializer,
     CreateRecipeSerializer,
     CustomUserSerializer,
     FavoriteSerializer,
@@ -27,27 +61,46 @@ from api.serializers import (
     SubscriptionSerializer,
     TagSerializer
 )
+from recipes.autocomplete import ingredient_index
+from recipes.cookable import cookable_index
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingList,
+    ShoppingListIngredient,
+    SimilarRecipe,
     Tag
 )
+from recipes.reference import ingredient_cache, tag_cache
 from users.models import Subscription, User
 
 
-class TagViewSet(CustomViewSetMixin):
+class TagViewSet(ConditionalGetMixin,
+                 AnonymousCacheMixin,
+                 CustomViewSetMixin):
     """Класс-вьюсет для модели Tag."""
 
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     pagination_class = None
+    conditional_tags = cache_tags = ('tags',)
+    async_read = True
+
+    def filter_queryset(self, queryset):
+        if self.action == 'list':
+            return tag_cache.all()
+        return super().filter_queryset(queryset)
 
+    def get_cache_tags(self, data):
+        return {'tags'}
 
-class IngredientViewSet(CustomViewSetMixin):
+
+class IngredientViewSet(ConditionalGetMixin,
+                        AnonymousCacheMixin,
+                        CustomViewSetMixin):
     """Класс-вьюсет для модели Ingredient."""
 
     queryset = Ingredient.objects.all()
@@ -56,9 +109,31 @@ class IngredientViewSet(CustomViewSetMixin):
     filter_backends = (DjangoFilterBackend, SearchFilter)
     filterset_class = IngredientFilter
     pagination_class = None
+    conditional_tags = cache_tags = ('ingredients',)
+    async_read = True
+
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get('name')
+        if self.action == 'list':
+            if name:
+                return ingredient_index.search(name)
+            return ingredient_cache.all()
+        return super().filter_queryset(queryset)
+
+    def get_cache_tags(self, data):
+        return {'ingredients'}
+
+
+class ShoppingCartTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Список покупок слишком длинный для выгрузки.'
+    default_code = 'shopping_cart_too_large'
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    AnonymousCacheMixin,
+                    CursorPaginationMixin,
+                    ModelViewSet):
     """Класс-вьюсет для модели Recipe."""
 
     queryset = Recipe.objects.all()
@@ -67,6 +142,53 @@ class RecipeViewSet(ModelViewSet):
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = CustomPaginator
+    cursor_pagination_class = CustomCursorPaginator
+    conditional_tags = cache_tags = (
+        'recipes', 'tags', 'ingredients', 'authors'
+    )
+    conditional_per_user = True
+    async_read = True
+
+    def get_queryset(self):
+        queryset = Recipe.objects.select_related('author').defer(
+            'search_vector'
+        ).prefetch_related(
+            Prefetch('tags'),
+            Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('author')))
+        )
+
+    def get_cache_tags(self, data):
+        tags = {'ingredients'}
+        if self.action == 'list':
+            tags.add('recipes')
+            recipes = data['results']
+        else:
+            recipes = [data]
+        for recipe in recipes:
+            tags.add(f"recipe:{recipe['id']}")
+            tags.add(f"author:{recipe['author']['id']}")
+            tags.update(f"tag:{tag['id']}" for tag in recipe['tags'])
+        return tags
 
     def perform_create(self, serializer):
         return serializer.save(author=self.request.user)
@@ -74,7 +196,16 @@ class RecipeViewSet(ModelViewSet):
     def perform_update(self, serializer):
         return serializer.save(author=self.request.user)
 
+    def get_pagination_class(self):
+        if self.action == 'cookable':
+            return self.pagination_class
+        if self.action == 'feed':
+            return FeedCursorPaginator
+        return super().get_pagination_class()
+
     def get_serializer_class(self):
+        if self.action == 'cookable':
+            return CookableRecipeSerializer
         if self.request.method == 'GET':
             return GetRecipeListSerializer
         return CreateRecipeSerializer
@@ -113,29 +244,102 @@ class RecipeViewSet(ModelViewSet):
         ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, methods=['GET'])
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer
+        )
+    )
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_list__user=request.user).values(
+        """Отдает список покупок потоком в формате ?format=txt|csv|json."""
+        ingredients = ShoppingListIngredient.objects.filter(
+            user=request.user, amount__gt=0).values(
             'ingredient__name',
-            'ingredient__measurement_unit').annotate(amount=Sum('amount'))
+            'ingredient__measurement_unit',
+            'amount').order_by('ingredient__name')
 
-        shopping_list_data = [
-            f"{ingredient['ingredient__name']} - "
-            f"{ingredient['ingredient__measurement_unit']} | "
-            f"{ingredient['amount']}"
-            for ingredient in ingredients
-        ]
-        shopping_list_text = '\n'.join(shopping_list_data)
+        # Django 3.2 под ASGI читает потоковый ответ синхронно в цикле
+        # событий, где запросы к базе данных запрещены, а асинхронные
+        # итераторы StreamingHttpResponse принимает только с версии 4.2.
+        # Поэтому строки выбираются заранее. Строка списка - одна на
+        # ингредиент, так что их не больше, чем ингредиентов в
+        # справочнике, а SHOPPING_CART_ASGI_MAX_ROWS ограничивает память
+        # и при большом справочнике. Текст файла по-прежнему строится
+        # потоком.
+        if settings.SERVER_INTERFACE == 'asgi':
+            max_rows = settings.SHOPPING_CART_ASGI_MAX_ROWS
+            ingredients = list(ingredients[:max_rows + 1])
+            if len(ingredients) > max_rows:
+                raise ShoppingCartTooLarge()
+        else:
+            ingredients = ingredients.iterator()
 
-        filename = 'shopping_list.txt'
+        renderer = request.accepted_renderer
+        filename = f'{renderer.filename}.{renderer.format}'
         headers = {'Content-Disposition': f'attachment; filename={filename}'}
-        return HttpResponse(
-            shopping_list_text,
-            content_type='text/plain; charset=UTF-8',
+        return StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset=UTF-8',
             headers=headers
         )
 
+    @action(detail=False, methods=['GET'])
+    def cookable(self, request):
+        """Рецепты, которые можно приготовить из ?ingredients=<id>,
+        по убыванию доли имеющихся ингредиентов."""
+        query = CookableQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ranked = cookable_index.search(
+            query.validated_data['ingredients'],
+            query.validated_data['min_coverage']
+        )
+        page = self.paginate_queryset(ranked)
+        coverage = dict(page)
+        recipes = self.get_queryset().filter(pk__in=coverage).in_bulk()
+        for recipe_id, recipe in recipes.items():
+            recipe.coverage = coverage[recipe_id]
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, _ in page
+             if recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок пользователя от новых к старым."""
+        page = self.paginator.paginate_feed(request)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in page])
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for _, recipe_id in page
+             if recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        """Рецепты, которые часто добавляют вместе с данным."""
+        recipe = get_object_or_404(Recipe, id=pk)
+        similar_ids = list(SimilarRecipe.objects.filter(
+            recipe=recipe).values_list('similar_id', flat=True))
+        recipes = self.get_queryset().in_bulk(similar_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in similar_ids
+             if recipe_id in recipes],
+            many=True
+        )
+        return Response(serializer.data)
+
     def _base_add_favorite_shopping_list(self,
                                          request,
                                          pk,
@@ -153,15 +357,21 @@ class RecipeViewSet(ModelViewSet):
         )
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(CursorPaginationMixin, UserViewSet):
     """Класс-вьюсет для модели User."""
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPaginator
+    cursor_pagination_class = SubscriptionCursorPaginator
     lookup_field = 'id'
 
+    def get_pagination_class(self):
+        if self.action != 'subscriptions':
+            return self.pagination_class
+        return super().get_pagination_class()
+
     @action(detail=True, methods=['POST', 'DELETE'])
     def subscribe(self, request, id=None):
         user = request.user
@@ -192,11 +402,62 @@ class CustomUserViewSet(UserViewSet):
     @action(detail=False, methods=['GET'])
     def subscriptions(self, request):
         subscriber = Subscription.objects.filter(
-            user=request.user).select_related('author')
+            user=request.user).select_related('author__counters').annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
         page = self.paginate_queryset(subscriber)
+        self._attach_author_recipes(
+            page,
+            request.query_params.get('recipes_limit')
+        )
         serializer = SubscriptionSerializer(
             page,
             many=True,
             context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
+
+    def _attach_author_recipes(self, subscriptions, recipes_limit):
+        """Загружает рецепты всех авторов страницы одним запросом.
+
+        При заданном recipes_limit рецепты каждого автора ограничиваются
+        оконной функцией ROW_NUMBER() с разбиением по автору.
+        """
+        recipes = Recipe.objects.filter(
+            author__in=[subscription.author_id
+                        for subscription in subscriptions]
+        )
+        if recipes_limit:
+            ranked = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author'),
+                    order_by=F('pub_date').desc()
+                )
+            ).values('id', 'row_number')
+            sql, params = ranked.query.sql_with_params()
+            recipes = Recipe.objects.filter(id__in=RawSQL(
+                f'SELECT ranked.id FROM ({sql}) AS ranked '
+                f'WHERE ranked.row_number <= %s',
+                (*params, int(recipes_limit))
+            ))
+
+        author_recipes = defaultdict(list)
+        for recipe in recipes:
+            author_recipes[recipe.author_id].append(recipe)
+        for subscription in subscriptions:
+            subscription.author_recipes = author_recipes[
+                subscription.author_id]
+
+
+class MetricsView(APIView):
+    """Метрики процесса в формате Prometheus для сотрудников."""
+
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(
+            metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
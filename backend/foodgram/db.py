@@ -0,0 +1,49 @@
+"""Проверка постоянных соединений с базой данных.
+
+В Django 3.2 нет CONN_HEALTH_CHECKS: постоянное соединение, закрытое
+сервером (перезапуск PostgreSQL, таймаут PgBouncer), обнаруживается
+только ошибкой очередного запроса. Как и в Django 4.1, соединение
+проверяется лениво: обработчик request_started только помечает его,
+а проверка выполняется, когда запрос впервые обращается к базе данных.
+Запросы, которые отвечают из кеша, не тратят время на проверку.
+Неработающее соединение закрывается, и Django открывает новое.
+
+Проверку выполняет HealthCheckMixin бэкендов foodgram.backends,
+которые settings подставляет вместо бэкендов Django.
+"""
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+class HealthCheckMixin:
+    """Миксин DatabaseWrapper, проверяющий помеченное соединение перед
+    первым курсором или транзакцией запроса."""
+
+    health_check_done = True
+
+    def connect(self):
+        super().connect()
+        # Только что открытое соединение проверять незачем.
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or self.health_check_done:
+            return
+        self.health_check_done = True
+        # Внутри транзакции соединение не переоткрыть: ее ошибка
+        # обработается как обычно.
+        if not self.in_atomic_block and not self.is_usable():
+            self.close()
+
+
+@receiver(request_started)
+def schedule_health_checks(**kwargs):
+    for connection in connections.all():
+        if (isinstance(connection, HealthCheckMixin)
+                and connection.settings_dict.get('CONN_HEALTH_CHECKS')):
+            connection.health_check_done = False
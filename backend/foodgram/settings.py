@@ -9,6 +9,9 @@ config = AutoConfig(search_path=BASE_DIR)
 SECRET_KEY = config('SECRET_KEY', default='test1234', cast=str)
 DEBUG = config('DEBUG', default=False, cast=bool)
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default=['*'], cast=Csv())
+# wsgi - синхронные воркеры gunicorn, asgi - воркеры uvicorn
+# с асинхронным путем чтения (api.routers.AsyncReadRouter).
+SERVER_INTERFACE = config('SERVER_INTERFACE', default='wsgi')
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -29,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,12 +62,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Бэкенды Django заменяются подклассами с проверкой постоянных
+# соединений (foodgram.db).
+HEALTH_CHECK_ENGINES = {
+    'django.db.backends.postgresql': 'foodgram.backends.postgresql',
+    'django.db.backends.sqlite3': 'foodgram.backends.sqlite3',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': config(
             'DB_ENGINE',
             default='django.db.backends.postgresql',
-            cast=str
+            cast=lambda engine: HEALTH_CHECK_ENGINES.get(engine, engine)
         ),
         'NAME': config(
             'DB_NAME',
@@ -89,10 +100,46 @@ DATABASES = {
             'DB_PORT',
             default='5432',
             cast=int
+        ),
+        # Постоянные соединения: 0 - новое соединение на каждый запрос,
+        # None - без ограничения времени жизни.
+        'CONN_MAX_AGE': config(
+            'DB_CONN_MAX_AGE',
+            default=60,
+            cast=lambda value: None if value == 'None' else int(value)
+        ),
+        # Проверка постоянного соединения перед первым обращением
+        # запроса к базе данных (foodgram.db).
+        'CONN_HEALTH_CHECKS': config(
+            'DB_CONN_HEALTH_CHECKS',
+            default=True,
+            cast=bool
+        ),
+        # За PgBouncer в режиме transaction именованные курсоры
+        # .iterator() не переживают смену серверного соединения.
+        'DISABLE_SERVER_SIDE_CURSORS': config(
+            'DB_DISABLE_SERVER_SIDE_CURSORS',
+            default=False,
+            cast=bool
         )
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+            cast=str
+        ),
+        'LOCATION': config(
+            'CACHE_LOCATION',
+            default='foodgram',
+            cast=str
+        ),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -130,6 +177,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MAX_LENGTH_FILED = 200
 PAGE_SIZE = 6
+RESPONSE_CACHE_TIMEOUT = config(
+    'RESPONSE_CACHE_TIMEOUT',
+    default=300,
+    cast=int
+)
+IMAGE_MAX_SIZE = config(
+    'IMAGE_MAX_SIZE',
+    default=10 * 1024 * 1024,
+    cast=int
+)
+IMAGE_MAX_SIDE = config(
+    'IMAGE_MAX_SIDE',
+    default=6000,
+    cast=int
+)
+IMAGE_WORKERS = config(
+    'IMAGE_WORKERS',
+    default=2,
+    cast=int
+)
+FEED_WORKERS = config(
+    'FEED_WORKERS',
+    default=1,
+    cast=int
+)
+FEED_FANOUT_LIMIT = config(
+    'FEED_FANOUT_LIMIT',
+    default=10000,
+    cast=int
+)
+# Под ASGI строки списка покупок выбираются до ответа (api.views).
+SHOPPING_CART_ASGI_MAX_ROWS = config(
+    'SHOPPING_CART_ASGI_MAX_ROWS',
+    default=10000,
+    cast=int
+)
+REFERENCE_CACHE_CHECK_INTERVAL_MS = config(
+    'REFERENCE_CACHE_CHECK_INTERVAL_MS',
+    default=1000,
+    cast=int
+)
+AUTH_TOKEN_CACHE_SIZE = config(
+    'AUTH_TOKEN_CACHE_SIZE',
+    default=10000,
+    cast=int
+)
+AUTH_TOKEN_CACHE_LOCAL_TIMEOUT = config(
+    'AUTH_TOKEN_CACHE_LOCAL_TIMEOUT',
+    default=60,
+    cast=int
+)
+AUTH_TOKEN_CACHE_TIMEOUT = config(
+    'AUTH_TOKEN_CACHE_TIMEOUT',
+    default=300,
+    cast=int
+)
 
 # Авторизация и токены
 
@@ -138,7 +241,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPaginator',
     'PAGE_SIZE': PAGE_SIZE,
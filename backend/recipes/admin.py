@@ -6,6 +6,7 @@ from recipes.models import (
     IngredientInRecipe,
     Recipe,
     ShoppingList,
+    ShoppingListIngredient,
     Tag
 )
 
@@ -67,7 +68,7 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [IngredientInRecipeInlineAdmin]
 
     def count_of_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     count_of_favorites.short_description = 'Добавлено в избранное'
 
@@ -100,3 +101,21 @@ class FavoriteAdmin(admin.ModelAdmin):
         'recipe__name',
         'user__username'
     )
+
+
+@admin.register(ShoppingListIngredient)
+class ShoppingListIngredientAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'amount'
+    )
+    search_fields = (
+        'ingredient__name',
+        'user__username'
+    )
+    readonly_fields = (
+        'user',
+        'ingredient',
+        'amount'
+    )
@@ -0,0 +1,58 @@
+"""Индекс автодополнения ингредиентов в памяти процесса.
+
+Справочник ингредиентов меняется редко, поэтому каждый воркер держит
+отсортированный по названию массив и отвечает на префиксные запросы
+бинарным поиском, не обращаясь к базе данных. Индекс строится по
+справочнику recipes.reference.ingredient_cache и перестраивается, когда
+тот перечитывает ингредиенты: версия справочника сверяется с кешем
+Django не чаще раза в REFERENCE_CACHE_CHECK_INTERVAL_MS, а не при
+каждом нажатии клавиши.
+"""
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.reference import ingredient_cache
+
+
+class IngredientIndex:
+    """Отсортированный индекс названий ингредиентов."""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self._state = (None, [], [])
+        self._lock = Lock()
+
+    def search(self, query):
+        """Возвращает ингредиенты, название которых начинается с query,
+        а за ними - содержащие query в середине названия."""
+        keys, ingredients = self._get_state()
+        query = query.casefold()
+        position = bisect_left(keys, query)
+        prefix_end = position
+        while prefix_end < len(keys) and keys[prefix_end].startswith(query):
+            prefix_end += 1
+        substring = [
+            ingredients[index] for index, key in enumerate(keys)
+            if query in key and not key.startswith(query)
+        ]
+        return ingredients[position:prefix_end] + substring
+
+    def _get_state(self):
+        # Справочник заменяет список целиком, поэтому другой объект
+        # списка означает, что ингредиенты перечитаны.
+        objects = self.reference.all()
+        loaded, keys, ingredients = self._state
+        if loaded is not objects:
+            with self._lock:
+                loaded, keys, ingredients = self._state
+                if loaded is not objects:
+                    ingredients = sorted(
+                        objects,
+                        key=lambda obj: (obj.name.casefold(), obj.id)
+                    )
+                    keys = [obj.name.casefold() for obj in ingredients]
+                    self._state = (objects, keys, ingredients)
+        return keys, ingredients
+
+
+ingredient_index = IngredientIndex(ingredient_cache)
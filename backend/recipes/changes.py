@@ -0,0 +1,27 @@
+"""Оповещение об изменениях, сделанных в обход сигналов моделей.
+
+bulk_create(), update() и команды загрузки данных не вызывают сигналы
+post_save и post_delete, на которые подписаны справочники, индексы
+и кеш ответов API. После таких изменений вызывается notify_changed():
+она сбрасывает справочники приложения recipes и отправляет сигнал
+data_changed, по которому остальные приложения сбрасывают свои кеши.
+"""
+from django.dispatch import Signal
+
+from recipes.models import Ingredient, Tag
+from recipes.reference import ingredient_cache, tag_cache
+
+# Аргументы: sender - модель, pks - id изменившихся объектов или None,
+# если изменились неизвестные или все объекты модели.
+data_changed = Signal()
+
+REFERENCE_CACHES = {
+    Ingredient: ingredient_cache,
+    Tag: tag_cache,
+}
+
+
+def notify_changed(model, pks=None):
+    if model in REFERENCE_CACHES:
+        REFERENCE_CACHES[model].invalidate()
+    data_changed.send(sender=model, pks=pks)
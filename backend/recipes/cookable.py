@@ -0,0 +1,130 @@
+"""Индекс «что приготовить из имеющихся ингредиентов».
+
+Каждый воркер держит инвертированный индекс ингредиент -> отсортированный
+массив id рецептов и число ингредиентов каждого рецепта. Покрытие рецепта
+набором продуктов - доля его ингредиентов, вошедших в набор, - считается
+по этим массивам без обращения к базе данных.
+
+Индекс обновляется инкрементально: при изменении рецепта его id
+записывается в кеш Django под очередным номером журнала изменений, и
+воркеры перечитывают из базы только ингредиенты изменившихся рецептов.
+Если журнал отстал больше чем на MAX_CHANGES записей или его записи
+вытеснены из кеша, индекс строится заново.
+"""
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from threading import Lock
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import IngredientInRecipe
+
+
+class CookableIndex:
+    """Инвертированный индекс рецептов по ингредиентам."""
+
+    GENERATION_KEY = 'cookable_index_generation'
+    SEQUENCE_KEY = 'cookable_index_sequence'
+    CHANGE_KEY = 'cookable_index_change:{}'
+    CHANGE_TIMEOUT = 60 * 60
+    MAX_CHANGES = 1000
+
+    def __init__(self):
+        self._lock = Lock()
+        self._generation = None
+        self._sequence = 0
+        self._postings = {}
+        self._recipes = {}
+
+    def invalidate(self):
+        """Требует полного перестроения индекса во всех воркерах
+        после фиксации текущей транзакции, как и записи журнала."""
+        transaction.on_commit(
+            lambda: cache.set(self.GENERATION_KEY, uuid4().hex, None))
+
+    def recipe_changed(self, recipe_id):
+        """Записывает изменение состава рецепта в журнал."""
+        cache.add(self.SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(self.SEQUENCE_KEY)
+        cache.set(
+            self.CHANGE_KEY.format(sequence), recipe_id, self.CHANGE_TIMEOUT
+        )
+
+    def search(self, ingredient_ids, min_coverage=0):
+        """Возвращает пары (id рецепта, покрытие) для рецептов, в которых
+        есть хотя бы один из ингредиентов ingredient_ids.
+
+        Рецепты упорядочены по убыванию покрытия, затем по числу
+        недостающих ингредиентов и от новых к старым."""
+        with self._lock:
+            self._refresh()
+            matched = Counter()
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self._postings.get(ingredient_id, ()))
+            ranked = []
+            for recipe_id, count in matched.items():
+                total = len(self._recipes[recipe_id])
+                coverage = count / total
+                if coverage >= min_coverage:
+                    ranked.append(
+                        (-coverage, total - count, -recipe_id, coverage)
+                    )
+        ranked.sort()
+        return [(-recipe_id, coverage)
+                for _, _, recipe_id, coverage in ranked]
+
+    def _refresh(self):
+        generation = cache.get_or_set(self.GENERATION_KEY, uuid4().hex, None)
+        sequence = cache.get(self.SEQUENCE_KEY, 0)
+        if (generation != self._generation
+                or not self._sequence <= sequence
+                <= self._sequence + self.MAX_CHANGES):
+            self._load(generation, sequence)
+        elif sequence > self._sequence:
+            keys = [self.CHANGE_KEY.format(number)
+                    for number in range(self._sequence + 1, sequence + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) < len(keys):
+                self._load(generation, sequence)
+            else:
+                self._apply(set(changes.values()))
+                self._sequence = sequence
+
+    def _load(self, generation, sequence):
+        # Номер журнала читается до загрузки: изменения, записанные
+        # во время загрузки, будут применены повторно, что безопасно.
+        postings = {}
+        recipes = {}
+        rows = IngredientInRecipe.objects.values_list(
+            'ingredient_id', 'recipe_id'
+        ).order_by('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator():
+            if ingredient_id not in postings:
+                postings[ingredient_id] = array('l')
+            postings[ingredient_id].append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+        self._generation = generation
+        self._sequence = sequence
+        self._postings = postings
+        self._recipes = recipes
+
+    def _apply(self, recipe_ids):
+        for recipe_id in recipe_ids:
+            for ingredient_id in self._recipes.pop(recipe_id, ()):
+                recipe_ids_array = self._postings[ingredient_id]
+                del recipe_ids_array[bisect_left(recipe_ids_array, recipe_id)]
+        rows = IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows:
+            insort(
+                self._postings.setdefault(ingredient_id, array('l')),
+                recipe_id
+            )
+            self._recipes.setdefault(recipe_id, []).append(ingredient_id)
+
+
+cookable_index = CookableIndex()
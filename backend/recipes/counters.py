@@ -0,0 +1,36 @@
+"""Пересчет денормализованных счетчиков рецептов и пользователей."""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Subscription, User, UserCounters
+
+
+def count_subquery(queryset, field):
+    """Подзапрос COUNT(*) строк queryset, связанных с внешней строкой."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+@transaction.atomic
+def reconcile():
+    """Пересчитывает все счетчики несколькими UPDATE с подзапросами."""
+    recipes = Recipe.objects.update(
+        favorites_count=count_subquery(Favorite.objects, 'recipe'),
+        in_carts_count=count_subquery(ShoppingList.objects, 'recipe')
+    )
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=user_id)
+         for user_id in User.objects.filter(
+             counters__isnull=True).values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    # Первичный ключ UserCounters совпадает с id пользователя.
+    users = UserCounters.objects.update(
+        recipes_count=count_subquery(Recipe.objects, 'author'),
+        followers_count=count_subquery(Subscription.objects, 'author')
+    )
+    return recipes, users
@@ -0,0 +1,198 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+При публикации рецепта его id записывается в ленты FeedEntry всех
+подписчиков автора (fan-out-on-write), поэтому чтение ленты - это
+выборка по индексу (user, pub_date) без соединения с подписками.
+Рецепты популярных авторов, у которых больше FEED_FANOUT_LIMIT
+подписчиков, в ленты не раскладываются и подмешиваются при чтении
+(fan-out-on-read) по индексу (author, pub_date). Когда после отписки
+автор перестает быть популярным, его рецепты раскладываются по лентам
+оставшихся подписчиков.
+
+Раскладка рецепта и дозаполнение лент после отписки выполняются
+в пуле фоновых потоков: у автора может быть до FEED_FANOUT_LIMIT
+подписчиков, и тысячи вставок не задерживают ответ на запрос.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, UserCounters
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+_executor = None
+_executor_lock = Lock()
+
+
+def is_popular(author_id):
+    return UserCounters.objects.filter(
+        user=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(recipe_id):
+    """Добавляет опубликованный рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'pub_date').first()
+    if recipe is None or is_popular(recipe['author_id']):
+        return
+    followers = Subscription.objects.filter(
+        author=recipe['author_id']).values_list('user_id', flat=True)
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=recipe['author_id'],
+            pub_date=recipe['pub_date']
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def follow(user_id, author_id):
+    """Переносит в ленту подписчика опубликованные рецепты автора."""
+    if is_popular(author_id):
+        return
+    recipes = Recipe.objects.filter(author=author_id).values_list(
+        'id', 'pub_date')
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date
+        )
+        for recipe_id, pub_date in recipes.iterator()
+    )
+
+
+def unfollow(user_id, author_id):
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def follower_removed(author_id):
+    """Раскладывает рецепты автора по лентам подписчиков, если после
+    отписки автор больше не популярен, а в лентах нет его рецептов:
+    пока автор был популярным, они в ленты не попадали.
+
+    Порог проверяется нестрого, потому что массовое удаление подписок
+    может перевести счетчик через FEED_FANOUT_LIMIT сразу на несколько
+    подписчиков.
+    """
+    if is_popular(author_id) or not _has_missing_entries(author_id):
+        return
+    backfill(author_id)
+
+
+def backfill(author_id):
+    """Добавляет все рецепты автора в ленты всех его подписчиков."""
+    recipes = list(Recipe.objects.filter(author=author_id).values_list(
+        'id', 'pub_date'))
+    followers = Subscription.objects.filter(
+        author=author_id).values_list('user_id', flat=True)
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date
+        )
+        for user_id in followers.iterator()
+        for recipe_id, pub_date in recipes
+    )
+
+
+def rebuild():
+    """Заполняет ленты всех пользователей заново по подпискам."""
+    FeedEntry.objects.all().delete()
+    subscriptions = Subscription.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in subscriptions.iterator():
+        follow(user_id, author_id)
+
+
+def get_page(user_id, position=None, limit=settings.PAGE_SIZE):
+    """Возвращает до limit пар (pub_date, id рецепта) ленты пользователя
+    от новых к старым, начиная после позиции position."""
+    entries = FeedEntry.objects.filter(user=user_id)
+    popular_authors = Subscription.objects.filter(
+        user=user_id,
+        author__counters__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('author')
+    recipes = Recipe.objects.filter(author__in=popular_authors)
+    if position is not None:
+        pub_date, recipe_id = position
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        recipes = recipes.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    rows = list(entries.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')[:limit])
+    # Рецепты автора, ставшего популярным, могут уже лежать в ленте.
+    rows.extend(recipes.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id')[:limit])
+    return sorted(set(rows), reverse=True)[:limit]
+
+
+def schedule(task, *args):
+    """Ставит задачу ленты в пул фоновых потоков.
+
+    При FEED_WORKERS = 0 задача выполняется синхронно.
+    """
+    global _executor
+
+    if not settings.FEED_WORKERS:
+        task(*args)
+        return
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.FEED_WORKERS,
+                    thread_name_prefix='recipe-feed'
+                )
+    _executor.submit(_run_in_worker, task, *args)
+
+
+def _run_in_worker(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception('Не удалось обновить ленты: %s%r',
+                         task.__name__, args)
+    finally:
+        connections.close_all()
+
+
+def _has_missing_entries(author_id):
+    """Проверяет, есть ли подписчик без последнего рецепта автора
+    в ленте: рецепты популярного автора не попадают ни в ленты
+    при публикации, ни в ленты новых подписчиков."""
+    latest = Recipe.objects.filter(author=author_id).order_by(
+        '-pub_date', '-id').values('id')[:1]
+    if not latest.exists():
+        return False
+    return Subscription.objects.filter(author=author_id).exclude(
+        user__in=FeedEntry.objects.filter(recipe__in=latest).values('user')
+    ).exists()
+
+
+def _bulk_create(entries):
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
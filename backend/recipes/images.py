@@ -0,0 +1,121 @@
+"""Подготовка уменьшенных копий картинок рецептов.
+
+После сохранения рецепта с новой картинкой пул фоновых потоков строит
+варианты card, detail и retina в JPEG и WebP и сохраняет их пути
+в Recipe.image_variants, не задерживая ответ на запрос. Копии
+предыдущей картинки удаляются, когда сохранены копии новой.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image
+
+from recipes.changes import notify_changed
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'card': 480,
+    'detail': 960,
+    'retina': 1920,
+}
+FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+VARIANTS_DIR = 'recipes/images/variants'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def build_variants(image_name):
+    """Строит все варианты картинки image_name и возвращает их пути."""
+    with default_storage.open(image_name) as file:
+        source = Image.open(file)
+        source.load()
+    if source.mode not in ('RGB', 'L'):
+        source = source.convert('RGB')
+
+    stem = PurePosixPath(image_name).stem
+    variants = {'source': image_name}
+    for variant, size in VARIANTS.items():
+        image = source.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        variants[variant] = {}
+        for extension, options in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, **options)
+            variants[variant][extension] = default_storage.save(
+                f'{VARIANTS_DIR}/{stem}_{variant}.{extension}',
+                ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def delete_variants(variants):
+    """Удаляет файлы вариантов, построенных build_variants()."""
+    for variant in VARIANTS:
+        for path in variants.get(variant, {}).values():
+            default_storage.delete(path)
+
+
+def process_recipe_image(recipe_id):
+    """Строит варианты картинки рецепта и сохраняет их пути."""
+    from recipes.models import Recipe
+
+    try:
+        recipe = Recipe.objects.get(pk=recipe_id)
+        if not recipe.image or recipe.has_image_variants():
+            return
+        image_name = recipe.image.name
+        variants = build_variants(image_name)
+        # Пока строились варианты, картинку могли заменить: тогда они
+        # уже не нужны, а варианты новой картинки построит ее задача.
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=image_name
+        ).update(image_variants=variants)
+        if not updated:
+            delete_variants(variants)
+            return
+        notify_changed(Recipe, [recipe_id])
+        delete_variants(recipe.image_variants)
+    except Exception:
+        logger.exception(
+            'Не удалось подготовить картинки рецепта %s', recipe_id)
+
+
+def _process_in_worker(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_recipe_image(recipe_id):
+    """Ставит обработку картинки рецепта в пул фоновых потоков.
+
+    При IMAGE_WORKERS = 0 картинка обрабатывается синхронно.
+    """
+    global _executor
+
+    if not settings.IMAGE_WORKERS:
+        process_recipe_image(recipe_id)
+        return
+    if _executor is None:
+        # Задачи ставятся из потоков воркера, и без блокировки каждый
+        # из них мог бы создать свой пул.
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix='recipe-images'
+                )
+    _executor.submit(_process_in_worker, recipe_id)
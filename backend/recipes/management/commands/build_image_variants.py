@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии картинок рецептов, у которых их нет.'
+
+    def handle(self, *args, **options):
+        processed = 0
+        for recipe in Recipe.objects.only('id', 'image', 'image_variants'):
+            if recipe.image and not recipe.has_image_variants():
+                process_recipe_image(recipe.id)
+                processed += 1
+        print(f'Обработано картинок: {processed}.')
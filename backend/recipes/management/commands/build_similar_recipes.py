@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает похожие рецепты по совместным добавлениям '
+            'в избранное и списки покупок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=similarity.TOP_K,
+            help='Сколько похожих рецептов хранить для каждого рецепта.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=similarity.CHUNK_SIZE,
+            help='Сколько рецептов обрабатывать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        recipes, written = similarity.build(
+            options['top'], options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        print(f'Обработано {recipes} рецептов, записано {written} '
+              f'похожих за {elapsed:.2f} с.')
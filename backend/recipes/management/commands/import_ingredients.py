@@ -0,0 +1,122 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.changes import notify_changed
+from recipes.models import Ingredient
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json(file):
+    """Построчно разбирает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+READERS = {
+    'json': iter_json,
+    'csv': iter_csv,
+}
+
+
+class Command(BaseCommand):
+    help = ('Загружает справочник ингредиентов из JSON или CSV пакетами. '
+            'Повторный запуск добавляет только новые пары '
+            '(название, единица измерения).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join('recipes/data', 'ingredients.json')
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать новые ингредиенты, не записывая их.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (options['format']
+                       or os.path.splitext(path)[1].lstrip('.').lower())
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+
+        started = time.perf_counter()
+        read = created = 0
+        try:
+            with open(path, mode='r', encoding='UTF-8', newline='') as file:
+                rows = READERS[file_format](file)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    read += len(batch)
+                    created += self.import_batch(batch, options['dry_run'])
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+        except (KeyError, IndexError, ValueError) as err:
+            raise CommandError(f'Не удалось прочитать {path}: {err}')
+
+        if created and not options['dry_run']:
+            notify_changed(Ingredient)
+
+        elapsed = time.perf_counter() - started
+        action = 'Будет добавлено' if options['dry_run'] else 'Добавлено'
+        print(f'Прочитано {read}, {action.lower()} {created} ингредиентов '
+              f'за {elapsed:.2f} с ({read / elapsed:.0f} строк/с).')
+
+    def import_batch(self, batch, dry_run):
+        """Добавляет отсутствующие в базе ингредиенты пакета."""
+        batch = {(name.strip(), unit.strip()) for name, unit in batch}
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in batch}
+        ).values_list('name', 'measurement_unit'))
+        new = batch - existing
+        if new and not dry_run:
+            # ignore_conflicts защищает от параллельной загрузки тех же строк.
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in new],
+                ignore_conflicts=True
+            )
+        return len(new)
@@ -3,6 +3,7 @@ import os
 
 from django.core.management.base import BaseCommand
 
+from recipes.changes import notify_changed
 from recipes.models import Ingredient
 
 
@@ -21,6 +22,7 @@ class Command(BaseCommand):
         except Exception as err:
             print(f'Не удалось загрузить данные: {err}')
         else:
+            notify_changed(Ingredient)
             print('Данные успешно добавлены в базу данных Foodgram.')
 
     def load_models(self):
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = ('Заполняет ленты подписок заново, например после массовой '
+            'загрузки рецептов или изменения FEED_FANOUT_LIMIT.')
+
+    def handle(self, *args, **options):
+        feed.rebuild()
+        print('Ленты подписок перестроены.')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes import search
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает поисковые векторы всех рецептов, например '
+            'после массовой загрузки данных в обход сигналов.')
+
+    def handle(self, *args, **options):
+        search.refresh()
+        print('Поисковый индекс рецептов перестроен.')
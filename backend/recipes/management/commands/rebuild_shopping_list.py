@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает агрегат списков покупок с нуля '
+            'или проверяет его расхождение с данными (--verify).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить агрегат, не изменяя его.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            count = shopping_list.rebuild()
+            print(f'Агрегат списков покупок пересчитан: {count} строк.')
+            return
+
+        expected = shopping_list.calculate()
+        actual = shopping_list.stored()
+        drift = {
+            key: (actual.get(key), expected.get(key))
+            for key in {*expected, *actual}
+            if actual.get(key) != expected.get(key)
+        }
+        for (user_id, ingredient_id), (stored, calculated) in sorted(
+                drift.items()):
+            print(f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                  f'сохранено {stored}, должно быть {calculated}')
+        if drift:
+            raise CommandError(
+                f'Агрегат списков покупок расходится в {len(drift)} строках.'
+            )
+        print('Агрегат списков покупок согласован с данными.')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики избранного, списков покупок, '
+            'рецептов и подписчиков по данным базы.')
+
+    def handle(self, *args, **options):
+        recipes, users = reconcile()
+        print(f'Счетчики пересчитаны: {recipes} рецептов, '
+              f'{users} пользователей.')
@@ -0,0 +1,198 @@
+import io
+import random
+import time
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from recipes import feed, search, shopping_list, tag_masks
+from recipes.changes import notify_changed
+from recipes.cookable import cookable_index
+from recipes.counters import reconcile
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from users.models import Subscription, User
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+IMAGE_NAME = 'recipes/images/seed.jpg'
+PASSWORD = 'foodgram-seed'
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, рецептами, '
+            'избранным, списками покупок и подписками для нагрузочных '
+            'проверок. Данные добавляются пакетными INSERT, после чего '
+            'пересчитываются счетчики, агрегаты и индексы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=10000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            nargs=2,
+            default=(3, 12),
+            metavar=('MIN', 'MAX')
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Зерно генератора для воспроизводимых наборов данных.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт.')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'seed{uuid4().hex[:8]}'
+        started = time.perf_counter()
+
+        if not Ingredient.objects.exists():
+            call_command('import_ingredients')
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        tag_ids = self.create_tags()
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, ingredients, tag_ids,
+            options['ingredients_per_recipe']
+        )
+        self.create_pairs(
+            Favorite, 'recipe_id', options['favorites'], user_ids, recipe_ids)
+        self.create_pairs(
+            ShoppingList, 'recipe_id', options['carts'], user_ids, recipe_ids)
+        self.create_pairs(
+            Subscription, 'author_id', options['subscriptions'], user_ids,
+            user_ids
+        )
+        seeded = time.perf_counter() - started
+
+        self.rebuild_derived_data()
+        elapsed = time.perf_counter() - started
+        print(f'Созданы данные с префиксом {self.prefix} за {seeded:.1f} с, '
+              f'производные данные пересчитаны, всего {elapsed:.1f} с.')
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color})
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (User(username=f'{self.prefix}_{number}',
+                  email=f'{self.prefix}_{number}@example.com',
+                  first_name='Тест',
+                  last_name=f'Пользователь {number}',
+                  password=password)
+             for number in range(count)),
+            batch_size=self.batch_size
+        )
+        # На SQLite bulk_create не возвращает id, поэтому они читаются
+        # из базы по префиксу.
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).values_list('id', flat=True))
+        print(f'Пользователей: {len(user_ids)}')
+        return user_ids
+
+    def create_recipes(self, count, user_ids, ingredients, tag_ids,
+                       ingredients_per_recipe):
+        image = self.get_image()
+        Recipe.objects.bulk_create(
+            (Recipe(author_id=self.random.choice(user_ids),
+                    name=self.get_recipe_name(ingredients),
+                    text=self.get_recipe_text(ingredients),
+                    image=image,
+                    cooking_time=self.random.randint(5, 180))
+             for _ in range(count)),
+            batch_size=self.batch_size
+        )
+        recipe_ids = list(Recipe.objects.filter(
+            author__in=user_ids).values_list('id', flat=True))
+
+        low, high = ingredients_per_recipe
+        ingredient_ids = [ingredient_id for ingredient_id, _ in ingredients]
+        IngredientInRecipe.objects.bulk_create(
+            (IngredientInRecipe(recipe_id=recipe_id,
+                                ingredient_id=ingredient_id,
+                                amount=self.random.randint(1, 500))
+             for recipe_id in recipe_ids
+             for ingredient_id in self.random.sample(
+                 ingredient_ids,
+                 min(self.random.randint(low, high), len(ingredient_ids)))),
+            batch_size=self.batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+             for recipe_id in recipe_ids
+             for tag_id in self.random.sample(
+                 tag_ids, self.random.randint(1, len(tag_ids)))),
+            batch_size=self.batch_size
+        )
+        print(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def create_pairs(self, model, target_field, count, user_ids, target_ids):
+        """Создает count уникальных пар (пользователь, объект)."""
+        count = min(count, len(user_ids) * len(target_ids) // 2)
+        pairs = set()
+        while len(pairs) < count:
+            pair = (self.random.choice(user_ids),
+                    self.random.choice(target_ids))
+            if pair[0] != pair[1] or target_field != 'author_id':
+                pairs.add(pair)
+        model.objects.bulk_create(
+            (model(user_id=user_id, **{target_field: target_id})
+             for user_id, target_id in pairs),
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+        print(f'{model._meta.verbose_name_plural}: {len(pairs)}')
+
+    def rebuild_derived_data(self):
+        """Пересчитывает то, что обычно поддерживают сигналы моделей."""
+        reconcile()
+        tag_masks.rebuild()
+        shopping_list.rebuild()
+        search.refresh()
+        feed.rebuild()
+        cookable_index.invalidate()
+        for model in (User, Tag, Ingredient, Recipe):
+            notify_changed(model)
+
+    def get_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (1200, 800), '#E26C2D').save(buffer, 'JPEG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def get_recipe_name(self, ingredients):
+        first, second = self.random.sample(ingredients, 2)
+        return f'{first[1].capitalize()} с {second[1]}'[:200]
+
+    def get_recipe_text(self, ingredients):
+        words = [name for _, name in self.random.sample(ingredients, 5)]
+        return (f'Смешайте {", ".join(words[:3])}. Добавьте {words[3]} '
+                f'и {words[4]}, готовьте до готовности.')
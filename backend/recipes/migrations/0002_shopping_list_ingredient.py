@@ -0,0 +1,56 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_shopping_list_ingredients(apps, schema_editor):
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListIngredient = apps.get_model(
+        'recipes', 'ShoppingListIngredient')
+    totals = IngredientInRecipe.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values_list(
+        'recipe__shopping_list__user', 'ingredient'
+    ).annotate(amount=Sum('amount')).order_by()
+    ShoppingListIngredient.objects.bulk_create(
+        [ShoppingListIngredient(user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                amount=amount)
+         for user_id, ingredient_id, amount in totals],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_ingredients', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Покупатель')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_shopping_list_ingredients,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+# Поиск ингредиентов name__istartswith на PostgreSQL превращается
+# в UPPER("name"::text) LIKE UPPER('...%'), поэтому индекс строится
+# по тому же выражению с text_pattern_ops.
+INGREDIENT_NAME_INDEX = 'ingredient_upper_name_idx'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} '
+        f'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_shopping_list_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index,
+            drop_ingredient_name_index
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:31
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# GIN-индекс и заполнение вектора нужны только на PostgreSQL:
+# на других базах поиск идет по индексу в памяти процесса.
+SEARCH_VECTOR_INDEX = 'recipe_search_vector_idx'
+
+FILL_SEARCH_VECTOR = """
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('russian', COALESCE(recipe.name, '')), 'A')
+        || setweight(to_tsvector('russian', COALESCE(recipe.text, '')), 'B')
+        || setweight(to_tsvector('russian', COALESCE((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_ingredientinrecipe AS item
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = item.ingredient_id
+            WHERE item.recipe_id = recipe.id
+        ), '')), 'C')
+"""
+
+
+def create_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FILL_SEARCH_VECTOR)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} '
+        f'ON recipes_recipe USING GIN (search_vector)'
+    )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_VECTOR_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            create_search_vector_index,
+            drop_search_vector_index
+        ),
+    ]
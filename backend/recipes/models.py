@@ -1,4 +1,6 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator
@@ -8,6 +10,10 @@ from django.db import models
 from users.models import User
 
 
+# Маска тегов рецепта хранится в BigIntegerField, старший бит знаковый.
+MAX_TAG_BIT = 62
+
+
 class Tag(models.Model):
     """Класс управления данными тегов."""
 
@@ -27,6 +33,12 @@ class Tag(models.Model):
         unique=True,
         max_length=settings.MAX_LENGTH_FILED
     )
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске тегов рецепта',
+        unique=True,
+        editable=False,
+        validators=[MaxValueValidator(MAX_TAG_BIT)]
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -35,6 +47,23 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.bit is None and self.get_free_bit() is None:
+            raise ValidationError(
+                f'Тегов не может быть больше {MAX_TAG_BIT + 1}.')
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = self.get_free_bit()
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_free_bit():
+        """Первый свободный бит или None, если свободных нет."""
+        used = set(Tag.objects.values_list('bit', flat=True))
+        return next(
+            (bit for bit in range(MAX_TAG_BIT + 1) if bit not in used), None)
+
 
 class Ingredient(models.Model):
     """Класс управления справочником ингредиентов."""
@@ -66,6 +95,16 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Класс управления данными рецепта."""
 
+    # Поля, которые поддерживаются отдельными запросами UPDATE: счетчики,
+    # маска тегов, поисковый вектор и уменьшенные копии картинки.
+    DERIVED_FIELDS = frozenset((
+        'favorites_count',
+        'in_carts_count',
+        'tags_mask',
+        'search_vector',
+        'image_variants',
+    ))
+
     author = models.ForeignKey(
         User,
         related_name='recipes',
@@ -80,6 +119,12 @@ class Recipe(models.Model):
         'Картинка',
         upload_to='recipes/images/'
     )
+    image_variants = models.JSONField(
+        'Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(
         'Описание'
     )
@@ -110,15 +155,63 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлено в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавлено в списки покупок',
+        default=0,
+        editable=False
+    )
+    tags_mask = models.BigIntegerField(
+        'Маска тегов',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # Обычное сохранение существующего рецепта (сериализатор, админка)
+        # не записывает производные поля: в экземпляре они такие, какими
+        # были при загрузке, и затерли бы изменения, сделанные с тех пор.
+        # Производное поле сохраняется, только если передано явно.
+        if update_fields is None and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def has_image_variants(self):
+        return self.image_variants.get('source') == self.image.name
+
 
 class IngredientInRecipe(models.Model):
     """Класс управления списком ингредиентов в рецепте."""
@@ -220,3 +313,139 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.user} выбрал {self.recipe.name} для закупки.'
+
+
+class ShoppingListIngredient(models.Model):
+    """Класс хранения суммарного количества ингредиента в списке покупок.
+
+    Строки поддерживаются инкрементально модулем recipes.shopping_list
+    и пересчитываются командой rebuild_shopping_list.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Покупатель'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        'Количество'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return (f'{self.user} - купить {self.ingredient.name} '
+                f'{self.amount}')
+
+
+class FeedEntry(models.Model):
+    """Класс записи ленты рецептов подписчика.
+
+    Строки добавляются при публикации рецепта всем подписчикам автора
+    (модуль recipes.feed), кроме подписчиков популярных авторов, чьи
+    рецепты подмешиваются в ленту при чтении.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe.name} в ленте {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    """Класс хранения рецептов, похожих на данный.
+
+    Строки пересчитываются командой build_similar_recipes по совместным
+    добавлениям рецептов в избранное и списки покупок.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        'Сходство'
+    )
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.similar.name} похож на {self.recipe.name}'
@@ -0,0 +1,78 @@
+"""Справочники тегов и ингредиентов в памяти процесса.
+
+Теги и ингредиенты почти не меняются, поэтому каждый воркер загружает
+справочник целиком при первом обращении и дальше отвечает из памяти:
+списки тегов и ингредиентов и проверка id в сериализаторах не обращаются
+к базе данных. Актуальность сверяется с ключом версии в кеше Django;
+сигналы моделей меняют версию, и каждый воркер перечитывает справочник
+при следующем обращении. Чтобы не
+обращаться к кешу Django на каждый id в сериализаторе, версия
+сверяется не чаще раза в REFERENCE_CACHE_CHECK_INTERVAL_MS: другие
+воркеры видят изменение с такой задержкой, а изменивший - сразу.
+
+Объекты справочника общие для всех запросов процесса и не должны
+изменяться.
+"""
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import Ingredient, Tag
+
+
+class ReferenceCache:
+    """Все строки модели-справочника, упорядоченные по id."""
+
+    def __init__(self, model, version_key):
+        self.model = model
+        self.version_key = version_key
+        self._state = (None, [], {})
+        self._checked_at = None
+        self._lock = Lock()
+
+    def invalidate(self):
+        """Меняет версию после фиксации транзакции: иначе другой воркер
+        мог бы загрузить еще старые строки уже под новой версией."""
+        def bump_version():
+            cache.set(self.version_key, uuid4().hex, None)
+            self.expire()
+        transaction.on_commit(bump_version)
+
+    def expire(self):
+        """Сверяет версию при следующем обращении, не дожидаясь
+        интервала проверки."""
+        self._checked_at = None
+
+    def all(self):
+        return self._get_state()[0]
+
+    def get(self, pk):
+        """Объект по id или None, если такого нет."""
+        return self._get_state()[1].get(pk)
+
+    def _get_state(self):
+        loaded_version, objects, by_pk = self._state
+        checked_at = self._checked_at
+        if (checked_at is not None and monotonic() - checked_at
+                < settings.REFERENCE_CACHE_CHECK_INTERVAL_MS / 1000):
+            return objects, by_pk
+        version = cache.get_or_set(self.version_key, uuid4().hex, None)
+        if loaded_version != version:
+            # Потоки пула асинхронного чтения загружают справочник
+            # один раз, а не каждый поток отдельно.
+            with self._lock:
+                loaded_version, objects, by_pk = self._state
+                if loaded_version != version:
+                    objects = list(self.model.objects.order_by('pk'))
+                    by_pk = {obj.pk: obj for obj in objects}
+                    self._state = (version, objects, by_pk)
+        self._checked_at = monotonic()
+        return objects, by_pk
+
+
+tag_cache = ReferenceCache(Tag, 'tag_cache_version')
+ingredient_cache = ReferenceCache(Ingredient, 'ingredient_cache_version')
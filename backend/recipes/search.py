@@ -0,0 +1,184 @@
+"""Полнотекстовый поиск рецептов.
+
+На PostgreSQL у каждого рецепта хранится поле search_vector со словами
+названия (вес A), описания (вес B) и названий ингредиентов (вес C),
+нормализованными русским словарем. Поле покрыто GIN-индексом, а
+результаты поиска упорядочиваются по SearchRank.
+
+На остальных базах (SQLite в тестах и при локальной разработке)
+используется индекс в памяти процесса с упрощенным стеммингом. Его
+актуальность, как и у индекса ингредиентов, сверяется с ключом версии
+в кеше Django.
+"""
+import re
+from collections import defaultdict
+from uuid import uuid4
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector
+)
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Value,
+    When
+)
+
+from recipes.models import IngredientInRecipe, Recipe
+
+SEARCH_CONFIG = 'russian'
+
+# Веса разделов документа, как у ts_rank по умолчанию.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+
+WORD_PATTERN = re.compile(r'\w+')
+
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ов',
+    'ев', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+
+def is_full_text_supported():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    ingredient_names = IngredientInRecipe.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            Subquery(ingredient_names), weight='C', config=SEARCH_CONFIG
+        )
+    )
+
+
+def refresh(queryset=None):
+    """Пересчитывает search_vector у рецептов queryset одним UPDATE.
+
+    Без PostgreSQL сбрасывает индекс в памяти."""
+    if not is_full_text_supported():
+        recipe_index.invalidate()
+        return
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset.update(search_vector=search_vector())
+
+
+def search(queryset, query):
+    """Оставляет в queryset рецепты, подходящие под query,
+    и упорядочивает их по убыванию релевантности."""
+    if is_full_text_supported():
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-pub_date')
+    ranks = recipe_index.search(query)
+    if not ranks:
+        return queryset.none()
+    # Рангов немного (это суммы весов разделов), поэтому рецепты
+    # группируются по рангу: CASE с ветвью на каждый рецепт вычисляется
+    # для каждой строки и на тысячах совпадений становится квадратичным.
+    pks_by_rank = defaultdict(list)
+    for pk, rank in ranks.items():
+        pks_by_rank[rank].append(pk)
+    return queryset.filter(pk__in=ranks).annotate(
+        rank=Case(
+            *[When(pk__in=pks, then=Value(rank))
+              for rank, pks in pks_by_rank.items()],
+            output_field=FloatField()
+        )
+    ).order_by('-rank', '-pub_date')
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if (word.endswith(ending)
+                and len(word) - len(ending) >= MIN_STEM_LENGTH):
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_PATTERN.findall(text.casefold())]
+
+
+class RecipeSearchIndex:
+    """Инвертированный индекс рецептов для баз без полнотекстового поиска."""
+
+    VERSION_KEY = 'recipe_search_index_version'
+
+    def __init__(self):
+        self._state = (None, {})
+
+    def invalidate(self):
+        # Пока транзакция не зафиксирована, воркер, прочитавший новую
+        # версию, построил бы индекс по старым рецептам и не перестроил
+        # бы его до следующего изменения.
+        transaction.on_commit(
+            lambda: cache.set(self.VERSION_KEY, uuid4().hex, None))
+
+    def search(self, query):
+        """Возвращает словарь {id рецепта: ранг} для рецептов,
+        содержащих все слова запроса."""
+        postings = self._get_state()
+        terms = set(tokenize(query))
+        if not terms:
+            return {}
+        ranks = None
+        for term in terms:
+            matches = postings.get(term, {})
+            if ranks is None:
+                ranks = dict(matches)
+            else:
+                ranks = {
+                    pk: rank + matches[pk]
+                    for pk, rank in ranks.items() if pk in matches
+                }
+            if not ranks:
+                return {}
+        return ranks
+
+    def _get_state(self):
+        version = cache.get_or_set(self.VERSION_KEY, uuid4().hex, None)
+        loaded_version, postings = self._state
+        if loaded_version != version:
+            postings = self._load()
+            self._state = (version, postings)
+        return postings
+
+    def _load(self):
+        postings = defaultdict(lambda: defaultdict(float))
+
+        def add(pk, text, weight):
+            for term in tokenize(text):
+                postings[term][pk] += WEIGHTS[weight]
+
+        for recipe in Recipe.objects.values('id', 'name', 'text'):
+            add(recipe['id'], recipe['name'], 'A')
+            add(recipe['id'], recipe['text'], 'B')
+        for row in IngredientInRecipe.objects.values(
+            'recipe_id', 'ingredient__name'
+        ):
+            add(row['recipe_id'], row['ingredient__name'], 'C')
+        return {term: dict(ranks) for term, ranks in postings.items()}
+
+
+recipe_index = RecipeSearchIndex()
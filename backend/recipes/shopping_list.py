@@ -0,0 +1,131 @@
+"""Инкрементальное обслуживание агрегата списка покупок.
+
+Агрегат ShoppingListIngredient хранит суммарное количество каждого
+ингредиента в списке покупок пользователя, поэтому выгрузка списка
+не пересчитывает GROUP BY по всем рецептам корзины. Строки с нулевым
+количеством остаются в агрегате до пересчета и при чтении пропускаются.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import (
+    IngredientInRecipe,
+    ShoppingList,
+    ShoppingListIngredient
+)
+
+
+def get_recipe_amounts(recipe_id):
+    """Возвращает словарь {id ингредиента: количество} для рецепта."""
+    return dict(
+        IngredientInRecipe.objects.filter(
+            recipe=recipe_id).values_list('ingredient_id', 'amount')
+    )
+
+
+@transaction.atomic
+def apply_delta(user_ids, delta):
+    """Прибавляет изменения delta {id ингредиента: количество}
+    к агрегатам списков покупок пользователей user_ids."""
+    user_ids = list(user_ids)
+    delta = {
+        ingredient_id: amount
+        for ingredient_id, amount in delta.items() if amount
+    }
+    if not user_ids or not delta:
+        return
+
+    # Недостающие строки вставляются с нулевым количеством, а строки,
+    # которые успела вставить параллельная транзакция, пропускаются.
+    # Затем одно UPDATE прибавляет изменения ко всем строкам: оно
+    # блокирует их, и параллельные прибавления не теряются. Строки,
+    # дошедшие до нуля, не удаляются - иначе прибавление, ждущее
+    # блокировки удаляемой строки, пропало бы вместе с ней.
+    ShoppingListIngredient.objects.bulk_create(
+        [ShoppingListIngredient(user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                amount=0)
+         for user_id in user_ids
+         for ingredient_id, amount in delta.items() if amount > 0],
+        ignore_conflicts=True
+    )
+    ShoppingListIngredient.objects.filter(
+        user__in=user_ids,
+        ingredient__in=delta
+    ).update(amount=Greatest(F('amount') + Case(
+        *(When(ingredient=ingredient_id, then=Value(amount))
+          for ingredient_id, amount in delta.items()),
+        output_field=IntegerField()
+    ), 0))
+
+
+def add_recipe(user_id, recipe_id):
+    """Учитывает рецепт, добавленный в список покупок."""
+    apply_delta([user_id], get_recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    """Учитывает рецепт, удаленный из списка покупок."""
+    apply_delta(
+        [user_id],
+        {ingredient_id: -amount
+         for ingredient_id, amount in get_recipe_amounts(recipe_id).items()}
+    )
+
+
+def update_recipe(recipe_id, old_amounts, new_amounts=None):
+    """Переносит изменение состава рецепта в списки покупок,
+    в которые он добавлен. old_amounts и new_amounts - состав до
+    и после изменения; если new_amounts не передан, он читается из базы."""
+    if new_amounts is None:
+        new_amounts = get_recipe_amounts(recipe_id)
+    delta = {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+    apply_delta(
+        ShoppingList.objects.filter(
+            recipe=recipe_id).values_list('user_id', flat=True),
+        delta
+    )
+
+
+def calculate():
+    """Считает агрегат с нуля: {(id пользователя, id ингредиента): сумма}."""
+    totals = IngredientInRecipe.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values_list(
+        'recipe__shopping_list__user',
+        'ingredient'
+    ).annotate(amount=Sum('amount')).order_by()
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in totals
+    }
+
+
+def stored():
+    """Возвращает сохраненный агрегат в формате calculate()."""
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount
+        in ShoppingListIngredient.objects.filter(amount__gt=0).values_list(
+            'user_id', 'ingredient_id', 'amount')
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает агрегат с нуля, возвращает число строк."""
+    totals = calculate()
+    ShoppingListIngredient.objects.all().delete()
+    ShoppingListIngredient.objects.bulk_create(
+        [ShoppingListIngredient(user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                amount=amount)
+         for (user_id, ingredient_id), amount in totals.items()],
+        batch_size=1000
+    )
+    return len(totals)
@@ -0,0 +1,173 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from recipes import feed, search, shopping_list, tag_masks
+from recipes.cookable import cookable_index
+from recipes.images import schedule_recipe_image
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from recipes.reference import ingredient_cache, tag_cache
+from users.counters import change_user_counter
+from users.models import Subscription
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении рецепта его ингредиенты
+    # еще не удалены, и их количества можно вычесть из агрегата.
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_cache(sender, **kwargs):
+    ingredient_cache.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cache(sender, **kwargs):
+    tag_cache.invalidate()
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    Recipe.objects.filter(pk=recipe_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingList)
+def increment_in_carts_count(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, 'in_carts_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingList)
+def decrement_in_carts_count(sender, instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, 'in_carts_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_user_counter(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_user_counter(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if instance.image and not instance.has_image_variants():
+        transaction.on_commit(lambda: schedule_recipe_image(instance.id))
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search_vector(sender, instance, update_fields, **kwargs):
+    # Ингредиенты рецепта сериализатор записывает после save() в той же
+    # транзакции, поэтому вектор пересчитывается после ее фиксации.
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(
+        lambda: search.refresh(Recipe.objects.filter(pk=instance.id))
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        search.refresh(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def update_cookable_index(sender, instance, update_fields=None, **kwargs):
+    # Состав рецепта меняется только вместе с сохранением самого рецепта;
+    # сохранение производных полей (картинок, счетчиков) его не затрагивает.
+    if update_fields and set(update_fields) <= Recipe.DERIVED_FIELDS:
+        return
+    # После удаления Django обнуляет pk экземпляра, поэтому id
+    # запоминается до фиксации транзакции.
+    recipe_id = instance.id
+    transaction.on_commit(lambda: cookable_index.recipe_changed(recipe_id))
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_cookable_index(sender, **kwargs):
+    cookable_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: feed.schedule(feed.fan_out, instance.id)
+        )
+
+
+@receiver(post_save, sender=Subscription)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: feed.follow(instance.user_id, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_author_from_feed(sender, instance, **kwargs):
+    feed.unfollow(instance.user_id, instance.author_id)
+    # Счетчик подписчиков уменьшает другой обработчик этого сигнала,
+    # поэтому порог проверяется после фиксации транзакции.
+    author_id = instance.author_id
+    transaction.on_commit(
+        lambda: feed.schedule(feed.follower_removed, author_id)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # Экземпляр обновляется вместе с базой, чтобы ответ на запрос
+        # (сериализатор меняет теги до save()) показывал новую маску.
+        instance.tags_mask = tag_masks.update_recipes([instance.id])[
+            instance.id]
+    elif action == 'post_clear':
+        tag_masks.remove_tag(instance)
+    else:
+        tag_masks.update_recipes(pk_set)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_from_masks(sender, instance, **kwargs):
+    # Связи с рецептами удаляются каскадно, без сигнала m2m_changed.
+    tag_masks.remove_tag(instance)
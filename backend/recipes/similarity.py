@@ -0,0 +1,129 @@
+"""Похожие рецепты по совместным добавлениям пользователей.
+
+Сходство рецептов - косинусная мера по бинарной матрице
+«пользователь x рецепт», где единица означает, что рецепт есть
+в избранном или в списке покупок пользователя:
+
+    score(i, j) = co(i, j) / sqrt(n(i) * n(j)),
+
+где co(i, j) - число пользователей, добавивших оба рецепта, а n(i) -
+число пользователей, добавивших рецепт i.
+
+Матрица обрабатывается блоками по chunk_size рецептов: для блока
+читаются только его пользователи и их рецепты, а в памяти держатся
+счетчики co(i, j) для рецептов блока. Поэтому расход памяти зависит
+от размера блока, а не от общего числа добавлений.
+
+Счетчики блока - это произведение разреженной матрицы на ее же
+транспонированную: перебираются только пары рецептов одного
+пользователя, и работа растет как сумма квадратов числа добавлений
+пользователей, а не как квадрат числа рецептов. Поэтому scipy.sparse
+не понадобился: на 100 тысячах рецептов из seed_data пересчет занимает
+около минуты (api/tests/benchmarks/test_similarity.py), и большую
+его часть составляют запросы к базе данных.
+"""
+from collections import Counter, defaultdict
+from heapq import nlargest
+from math import sqrt
+
+from django.db import connection, transaction
+
+from recipes.models import Favorite, ShoppingList, SimilarRecipe
+
+TOP_K = 10
+CHUNK_SIZE = 500
+USERS_BATCH_SIZE = 500
+# Три параметра на строку: SQLite принимает не больше 999.
+INSERT_BATCH_SIZE = 300
+
+
+def interactions(**filters):
+    """Пары (id пользователя, id рецепта) из избранного и списков
+    покупок без повторов."""
+    return Favorite.objects.filter(**filters).values_list(
+        'user_id', 'recipe_id'
+    ).union(
+        ShoppingList.objects.filter(**filters).values_list(
+            'user_id', 'recipe_id')
+    )
+
+
+def count_users():
+    """Возвращает Counter {id рецепта: число добавивших его пользователей}."""
+    counts = Counter()
+    for _, recipe_id in interactions().iterator():
+        counts[recipe_id] += 1
+    return counts
+
+
+def build(top=TOP_K, chunk_size=CHUNK_SIZE):
+    """Пересчитывает SimilarRecipe для всех рецептов.
+
+    Возвращает число обработанных рецептов и записанных строк."""
+    counts = count_users()
+    recipe_ids = sorted(counts)
+    written = 0
+    for start in range(0, len(recipe_ids), chunk_size):
+        chunk = recipe_ids[start:start + chunk_size]
+        written += build_chunk(chunk, counts, top)
+    # Рецепты, которые больше никто не добавляет, теряют похожие.
+    stale = sorted(set(SimilarRecipe.objects.values_list(
+        'recipe_id', flat=True).order_by().distinct()) - counts.keys())
+    for start in range(0, len(stale), chunk_size):
+        SimilarRecipe.objects.filter(
+            recipe_id__in=stale[start:start + chunk_size]
+        ).delete()
+    return len(recipe_ids), written
+
+
+def build_chunk(chunk, counts, top):
+    chunk_recipes_of = defaultdict(list)
+    for user_id, recipe_id in interactions(recipe_id__in=chunk).iterator():
+        chunk_recipes_of[user_id].append(recipe_id)
+
+    common = defaultdict(Counter)
+    user_ids = list(chunk_recipes_of)
+    for start in range(0, len(user_ids), USERS_BATCH_SIZE):
+        batch = user_ids[start:start + USERS_BATCH_SIZE]
+        recipes_of = defaultdict(list)
+        for user_id, other_id in interactions(user_id__in=batch).iterator():
+            recipes_of[user_id].append(other_id)
+        # Counter.update со списком считает вхождения на C: это и есть
+        # умножение разреженной строки пользователя на его же столбец.
+        for user_id, others in recipes_of.items():
+            for recipe_id in chunk_recipes_of[user_id]:
+                common[recipe_id].update(others)
+
+    rows = []
+    for recipe_id, others in common.items():
+        del others[recipe_id]
+        norm = sqrt(counts[recipe_id])
+        rows.extend(
+            (recipe_id, other_id, score)
+            for score, other_id in nlargest(top, (
+                (count / (norm * sqrt(counts[other_id])), other_id)
+                for other_id, count in others.items()
+            ))
+        )
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=chunk).delete()
+        insert_rows(rows)
+    return len(rows)
+
+
+def insert_rows(rows):
+    """Записывает строки (recipe_id, similar_id, score) многострочными
+    INSERT: bulk_create тратил бы большую часть времени пересчета
+    на создание экземпляров модели."""
+    quote_name = connection.ops.quote_name
+    table = quote_name(SimilarRecipe._meta.db_table)
+    columns = ', '.join(
+        quote_name(column) for column in ('recipe_id', 'similar_id', 'score'))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start:start + INSERT_BATCH_SIZE]
+            values = ', '.join(['(%s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {values}',
+                [value for row in batch for value in row]
+            )
@@ -0,0 +1,59 @@
+"""Денормализованная маска тегов рецепта.
+
+Каждому тегу назначен свой бит (Tag.bit), а Recipe.tags_mask хранит
+объединение битов тегов рецепта. Фильтр по тегам проверяет пересечение
+масок на строке рецепта, без соединения с таблицей связей и без
+DISTINCT. Маску обновляют сигналы m2m_changed и удаления тегов,
+а rebuild() пересчитывает ее целиком.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import Recipe, Tag
+
+
+def get_mask(tags):
+    mask = 0
+    for tag in tags:
+        mask |= 1 << tag.bit
+    return mask
+
+
+def filter_recipes(queryset, tags):
+    """Рецепты, у которых есть хотя бы один из тегов."""
+    return queryset.alias(
+        matched_tags=F('tags_mask').bitand(get_mask(tags))
+    ).exclude(matched_tags=0)
+
+
+def update_recipes(recipe_ids):
+    """Пересчитывает маски рецептов и возвращает их по id рецепта."""
+    masks = dict.fromkeys(recipe_ids, 0)
+    for recipe_id, bit in Recipe.tags.through.objects.filter(
+            recipe_id__in=masks).values_list('recipe_id', 'tag__bit'):
+        masks[recipe_id] |= 1 << bit
+    recipe_ids_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        recipe_ids_by_mask[mask].append(recipe_id)
+    for mask, ids in recipe_ids_by_mask.items():
+        Recipe.objects.filter(pk__in=ids).update(tags_mask=mask)
+    return masks
+
+
+def remove_tag(tag):
+    """Снимает бит тега со всех рецептов."""
+    filter_recipes(Recipe.objects.all(), [tag]).update(
+        tags_mask=F('tags_mask').bitand(~(1 << tag.bit))
+    )
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает маски всех рецептов: по одному UPDATE на тег."""
+    Recipe.objects.update(tags_mask=0)
+    for tag in Tag.objects.only('id', 'bit'):
+        Recipe.objects.filter(tags=tag).update(
+            tags_mask=F('tags_mask').bitor(1 << tag.bit)
+        )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from users.models import Subscription, User
+from users.models import Subscription, User, UserCounters
 
 admin.site.unregister(User)
 
@@ -13,7 +13,9 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'followers_count'
     )
     search_fields = (
         'email',
@@ -23,6 +25,26 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name'
     )
+    list_select_related = (
+        'counters',
+    )
+
+    # Строки счетчиков может еще не быть (пользователь создан до них
+    # или в обход сигналов), тогда значение считается запросом.
+    def recipes_count(self, obj):
+        try:
+            return obj.counters.recipes_count
+        except UserCounters.DoesNotExist:
+            return obj.recipes.count()
+
+    def followers_count(self, obj):
+        try:
+            return obj.counters.followers_count
+        except UserCounters.DoesNotExist:
+            return obj.following.count()
+
+    recipes_count.short_description = 'Рецептов'
+    followers_count.short_description = 'Подписчиков'
 
 
 @admin.register(Subscription)
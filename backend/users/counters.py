@@ -0,0 +1,20 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from users.models import UserCounters
+
+
+def change_user_counter(user_id, field, delta):
+    """Атомарно изменяет счетчик пользователя на delta.
+
+    Недостающая строка счетчиков создается только при увеличении:
+    при каскадном удалении пользователя ее нельзя создавать заново.
+    """
+    updated = UserCounters.objects.filter(user=user_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    if not updated and delta > 0:
+        UserCounters.objects.get_or_create(
+            user_id=user_id,
+            defaults={field: delta}
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def fill_user_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    User = apps.get_model('auth', 'User')
+    UserCounters = apps.get_model('users', 'UserCounters')
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=user_id)
+         for user_id in User.objects.values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    UserCounters.objects.update(
+        recipes_count=count_subquery(Recipe.objects, 'author'),
+        followers_count=count_subquery(Subscription.objects, 'author')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('recipes', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='auth.user', verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.RunPython(
+            fill_user_counters,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -36,3 +36,35 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class UserCounters(models.Model):
+    """Класс хранения денормализованных счетчиков пользователя.
+
+    Модель пользователя стандартная, поэтому счетчики вынесены в связанную
+    один к одному таблицу. Поддерживаются сигналами и пересчитываются
+    командой reconcile_counters.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return f'Счетчики {self.user}'